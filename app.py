@@ -1,7 +1,16 @@
+import os
+import threading
+import time
+import uuid
+
 import streamlit as st
-import math
-import re
-import copy
+
+from calc_engine import (CancelToken, History, IncrementalEvaluator, LayeredCache, LRUCache, MetricsRegistry,
+                         PersistentCache, Profiler, Sandbox, error_category, is_interrupted, is_summary, timing)
+from keypad_component import keypad
+
+# Start of this script run, for the rerun duration metric
+RUN_STARTED = time.perf_counter()
 
 # Set page configuration with reduced resources
 st.set_page_config(
@@ -14,14 +23,6 @@ st.set_page_config(
 # Custom CSS with improved performance
 st.markdown("""
 <style>
-    .calculator-container {
-        max-width: 320px;
-        margin: 0 auto;
-        background-color: #202020;
-        border-radius: 10px;
-        padding: 15px;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.3);
-    }
     .display-area {
         background-color: #1C1C1E;
         color: white;
@@ -46,6 +47,12 @@ st.markdown("""
         font-weight: bold;
         overflow-wrap: break-word;
     }
+    .preview-display {
+        min-height: 18px;
+        color: #8a8a8a;
+        font-size: 14px;
+        overflow-wrap: break-word;
+    }
     button {
         width: 100% !important;
         height: 50px !important;
@@ -55,30 +62,6 @@ st.markdown("""
         margin: 3px 0 !important;
         transition: all 0.1s ease !important;
     }
-    .function-btn > button {
-        background-color: #4A4A4A !important;
-        color: white !important;
-    }
-    .number-btn > button {
-        background-color: #666666 !important;
-        color: white !important;
-        font-weight: bold !important;
-    }
-    .clear-btn > button {
-        background-color: #b3b3b3 !important;
-        color: black !important;
-        font-weight: bold !important;
-    }
-    .operator-btn > button {
-        background-color: #FF9500 !important;
-        color: white !important;
-        font-weight: bold !important;
-    }
-    .equals-btn > button {
-        background-color: #FF9500 !important;
-        color: white !important;
-        font-weight: bold !important;
-    }
     /* Fix button spacing issues */
     div[data-testid="column"] {
         padding: 0 3px !important;
@@ -113,185 +96,214 @@ if 'awaiting_second_operand' not in st.session_state:
     st.session_state.awaiting_second_operand = False
 if 'last_button' not in st.session_state:
     st.session_state.last_button = ''
+if 'preview_evaluator' not in st.session_state:
+    st.session_state.preview_evaluator = IncrementalEvaluator()
+
+# Calculations kept per session, and how many matches the history panel lists
+HISTORY_CAPACITY = 1000
+HISTORY_SHOWN = 20
+
+if 'history' not in st.session_state:
+    st.session_state.history = History(capacity=HISTORY_CAPACITY)
+if 'keys_applied' not in st.session_state:
+    # (keypad mount, number of its keys applied), acknowledged back to the keypad
+    st.session_state.keys_applied = (None, 0)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Results are pure, so one LRU cache is shared by every session in the
+# server process; each session keeps a small overlay of its recent results
+SHARED_CACHE_CAPACITY = 4096
+SESSION_CACHE_CAPACITY = 32
+CACHE_TTL = None  # Seconds; None keeps entries until they are evicted
+
+# With CALCULATOR_CACHE_FILE set, results that took at least
+# PERSIST_MIN_SECONDS to compute are also kept in that SQLite file, shared
+# by every server process and kept across restarts
+PERSISTENT_CACHE_FILE = os.environ.get('CALCULATOR_CACHE_FILE')
+PERSISTENT_CACHE_BYTES = 256 << 20
+PERSIST_MIN_SECONDS = 0.01
+
+# Upper bound in seconds for a single calculation such as a big factorial
+CALCULATION_TIMEOUT = 10
+
+# Calculations that may build huge numbers run in worker processes with
+# this much address space each, so a runaway one cannot stall the server
+CALCULATION_MEMORY_LIMIT = 1 << 30
+SANDBOX_WORKERS = 2
+
+# Live previews must never hold up a keypress
+PREVIEW_TIMEOUT = 0.05
+
+# Collect keys in the browser and send them in batches; False falls back to
+# plain Streamlit buttons, which cost one rerun per keypress. Setting
+# CALCULATOR_CLIENT_KEYPAD=0 turns it off, as benchmarks.bench_streamlit_clicks does.
+CLIENT_SIDE_KEYPAD = os.environ.get('CALCULATOR_CLIENT_KEYPAD', '1') != '0'
+
+# Prometheus metrics: served on this local port and/or written to this file
+# (for node_exporter's textfile collector) when the variables are set
+METRICS_PORT = os.environ.get('CALCULATOR_METRICS_PORT')
+METRICS_FILE = os.environ.get('CALCULATOR_METRICS_FILE')
+
+# A session counts as active if it has rerun within this many seconds
+ACTIVE_SESSION_WINDOW = 300
+
+@st.cache_resource
+def get_sandbox():
+    """Return the process-wide pool of sandboxed calculation workers"""
+    return Sandbox(timeout=CALCULATION_TIMEOUT, memory_limit=CALCULATION_MEMORY_LIMIT,
+                   workers=SANDBOX_WORKERS)
+
+@st.cache_resource
+def get_persistent_cache():
+    """Return the on-disk result cache, or None if it is not configured"""
+    if not PERSISTENT_CACHE_FILE:
+        return None
+    return PersistentCache(PERSISTENT_CACHE_FILE, max_bytes=PERSISTENT_CACHE_BYTES)
+
+@st.cache_resource
+def get_shared_cache():
+    """Return the process-wide result cache"""
+    cache = LRUCache(capacity=SHARED_CACHE_CAPACITY, ttl=CACHE_TTL)
+    persistent = get_persistent_cache()
+    if persistent is not None:
+        # Warm start: begin with the results most recently used by any process
+        persistent.warm(cache, SHARED_CACHE_CAPACITY)
+    return cache
 
-# Create a simple cache for repeated calculations
 if 'calculation_cache' not in st.session_state:
-    st.session_state.calculation_cache = {}
+    st.session_state.calculation_cache = LayeredCache(
+        get_shared_cache(),
+        LRUCache(capacity=SESSION_CACHE_CAPACITY, ttl=CACHE_TTL),
+    )
+
+class CalculatorMetrics:
+    """Metrics of this server process, shared by every session"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.evaluations = self.registry.counter(
+            'calculator_evaluations_total', "Calculations requested, by kind (expr or fact)", ('kind',))
+        self.latency = self.registry.histogram(
+            'calculator_evaluation_seconds', "Time to answer a calculation, including cache hits", ('kind',))
+        self.errors = self.registry.counter(
+            'calculator_errors_total', "Calculations that ended in an error, by error message", ('category',))
+        self.cache_lookups = self.registry.counter(
+            'calculator_cache_lookups_total', "Result cache lookups")
+        self.cache_hits = self.registry.counter(
+            'calculator_cache_hits_total', "Result cache lookups that found a result")
+        self.registry.gauge(
+            'calculator_cache_hit_ratio', "Result cache hits per lookup since start", function=self.hit_ratio)
+        self.registry.gauge(
+            'calculator_active_sessions', f"Sessions that reran in the last {ACTIVE_SESSION_WINDOW} seconds",
+            function=self.active_sessions)
+        self.reruns = self.registry.histogram(
+            'calculator_rerun_seconds', "Script run duration; scope is app for full runs, fragment for the calculator",
+            ('scope',))
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def record_calculation(self, kind, result, cache_hit, seconds):
+        self.evaluations.inc(kind=kind)
+        self.latency.observe(seconds, kind=kind)
+        self.cache_lookups.inc()
+        if cache_hit:
+            self.cache_hits.inc()
+        if result.startswith('Error'):
+            self.errors.inc(category=error_category(result))
+
+    def hit_ratio(self):
+        lookups = self.cache_lookups.total()
+        return self.cache_hits.total() / lookups if lookups else 0.0
+
+    def touch_session(self, session_id):
+        with self._sessions_lock:
+            self._sessions[session_id] = time.monotonic()
+
+    def active_sessions(self):
+        cutoff = time.monotonic() - ACTIVE_SESSION_WINDOW
+        with self._sessions_lock:
+            for session_id in [s for s, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            return len(self._sessions)
+
+@st.cache_resource
+def get_metrics():
+    """Return the process-wide metrics, starting their exporters on first use"""
+    metrics = CalculatorMetrics()
+    if METRICS_PORT:
+        metrics.registry.serve(int(METRICS_PORT))
+    if METRICS_FILE:
+        metrics.registry.write_periodically(METRICS_FILE)
+    return metrics
+
+@st.cache_resource
+def get_profiler():
+    """Return the process-wide stage timing profiler"""
+    return Profiler()
+
+def cached_calculation(cache_key, compute):
+    """Return a cached result, computing and caching it on a miss"""
+    started = time.perf_counter()
+    cache = st.session_state.calculation_cache
+    profiler = timing.active_profiler()
+    if profiler is None:
+        result = cache.get(cache_key)
+    else:
+        start = time.perf_counter_ns()
+        result = cache.get(cache_key)
+        profiler.observe('result_cache', time.perf_counter_ns() - start)
+    persistent = get_persistent_cache()
+    if result is None and persistent is not None:
+        result = persistent.get(cache_key)
+        if result is not None:
+            cache.put(cache_key, result)
+    cache_hit = result is not None
+    if not cache_hit:
+        computed = time.perf_counter()
+        result = compute()
+        # Timeouts depend on server load, not on the input, so don't keep them
+        if not is_interrupted(result):
+            cache.put(cache_key, result)
+            if persistent is not None and time.perf_counter() - computed >= PERSIST_MIN_SECONDS:
+                persistent.put(cache_key, result)
+    get_metrics().record_calculation(cache_key[0], result, cache_hit, time.perf_counter() - started)
+    return result
 
 def calculate_factorial(input_value):
     """Calculate factorial with caching for speed"""
-    # Check cache first for better performance
-    cache_key = f"fact_{input_value}"
-    if cache_key in st.session_state.calculation_cache:
-        return st.session_state.calculation_cache[cache_key]
-    
-    try:
-        # Convert input to integer
-        num = int(float(input_value))
-        
-        # Factorial is only defined for non-negative integers
-        if num < 0:
-            return "Error: Negative number"
-        
-        # Small optimization - handle common cases directly
-        if num <= 1:
-            result = "1"
-        elif num > 170:  # Python's factorial limit
-            result = "Error: Number too large"
-        else:
-            # Calculate factorial
-            result = str(math.factorial(num))
-        
-        # Cache the result for future use
-        st.session_state.calculation_cache[cache_key] = result
-        return result
-    
-    except ValueError:
-        return "Error: Invalid Input"
-    except OverflowError:
-        return "Error: Number too large"
+    return cached_calculation(
+        ('fact', str(input_value)),
+        lambda: get_sandbox().calculate_factorial(input_value),
+    )
 
 def evaluate_expression(expression):
     """Evaluate a mathematical expression with optimized performance"""
     if not expression:
         return "0"
     
-    # Check cache first for better performance
-    cache_key = f"expr_{expression}"
-    if cache_key in st.session_state.calculation_cache:
-        return st.session_state.calculation_cache[cache_key]
+    return cached_calculation(
+        ('expr', expression),
+        lambda: get_sandbox().evaluate_expression(expression),
+    )
+
+def live_preview():
+    """Preview the result of the expression being typed, or '' if there is none"""
+    if st.session_state.function_mode:
+        text = f"{st.session_state.function_name}({st.session_state.display}"
+    else:
+        text = st.session_state.expression
     
-    try:
-        # Replace all instances of 'π' with 'math.pi'
-        expression = expression.replace('π', 'math.pi')
-        # Replace all instances of 'e' with 'math.e'
-        expression = expression.replace('e', 'math.e')
-        
-        # Quick checks for division by zero before doing any regex
-        if '/0' in expression.replace('/0.', '').replace('/0e', ''):
-            return "Error: Division by zero"
-        
-        # Handle square root expressions
-        sqrt_pattern = r'√\((.*?)\)'
-        while re.search(sqrt_pattern, expression):
-            match = re.search(sqrt_pattern, expression)
-            if match:
-                inner_expr = match.group(1)
-                try:
-                    inner_value = eval(inner_expr)
-                    if inner_value < 0:
-                        return "Error: Cannot find square root of negative number"
-                    expression = expression.replace(f"√({inner_expr})", f"math.sqrt({inner_expr})")
-                except Exception:
-                    return "Error: Invalid expression in square root"
-        
-        # Handle cube root expressions
-        cube_root_pattern = r'∛\((.*?)\)'
-        while re.search(cube_root_pattern, expression):
-            match = re.search(cube_root_pattern, expression)
-            if match:
-                inner_expr = match.group(1)
-                expression = expression.replace(f"∛({inner_expr})", f"({inner_expr})**(1/3)")
-        
-        # Handle function patterns 
-        # Optimized to reduce redundant code
-        function_patterns = {
-            r'sin\((.*?)\)': lambda x: f"math.sin(math.radians({x}))",
-            r'cos\((.*?)\)': lambda x: f"math.cos(math.radians({x}))",
-            r'tan\((.*?)\)': lambda x: f"math.tan(math.radians({x}))",
-            r'log\((.*?)\)': lambda x: f"math.log10({x})",
-            r'ln\((.*?)\)': lambda x: f"math.log({x})",
-            r'x²\((.*?)\)': lambda x: f"({x})**2",
-            r'x³\((.*?)\)': lambda x: f"({x})**3"
-        }
-        
-        # Process all function patterns
-        for pattern, replacement_func in function_patterns.items():
-            while re.search(pattern, expression):
-                match = re.search(pattern, expression)
-                if match:
-                    inner_expr = match.group(1)
-                    
-                    # Special checks for functions with domain restrictions
-                    if 'log' in pattern or 'ln' in pattern:
-                        try:
-                            inner_value = eval(inner_expr)
-                            if inner_value <= 0:
-                                return f"Error: Cannot find {'log' if 'log10' in replacement_func(inner_expr) else 'ln'} of zero or negative number"
-                        except Exception:
-                            pass
-                    
-                    if 'tan' in pattern:
-                        try:
-                            angle_rad = math.radians(eval(inner_expr))
-                            if abs(math.cos(angle_rad)) < 1e-10:
-                                return "Error: Tangent undefined at this angle"
-                        except Exception:
-                            pass
-                    
-                    # Replace the pattern
-                    replacement = replacement_func(inner_expr)
-                    expression = expression.replace(match.group(0), replacement)
-                
-        # Handle factorial expressions
-        factorial_pattern = r'!\((.*?)\)'
-        while re.search(factorial_pattern, expression):
-            match = re.search(factorial_pattern, expression)
-            if match:
-                inner_expr = match.group(1)
-                try:
-                    inner_value = eval(inner_expr)
-                    fact_result = calculate_factorial(inner_value)
-                    if fact_result.startswith("Error"):
-                        return fact_result
-                    expression = expression.replace(f"!({inner_expr})", f"{fact_result}")
-                except Exception:
-                    return "Error: Invalid expression in factorial"
-        
-        # Handle percentage calculation
-        expression = expression.replace('%', '/100')
-        
-        # Replace × with * and ÷ with /
-        expression = expression.replace('×', '*').replace('÷', '/')
-        
-        # Evaluate the expression and get the result
-        try:
-            result = eval(expression)
-        except ZeroDivisionError:
-            return "Error: Division by zero"
-        except SyntaxError:
-            return "Error: Invalid syntax"
-        except Exception as e:
-            return f"Error: {str(e)}"
-        
-        # Handle special cases
-        if math.isnan(result):
-            return "Error: Not a number"
-        if math.isinf(result):
-            return "Error: Infinite result"
-        
-        # Format the result efficiently
-        if isinstance(result, float):
-            # If the result is very small or very large, use scientific notation
-            if abs(result) < 0.0001 or abs(result) > 10000000:
-                formatted_result = f"{result:.10e}"
-            else:
-                # Remove trailing zeros efficiently
-                formatted_result = f"{result:.10f}".rstrip('0').rstrip('.')
-                if '.' not in formatted_result:
-                    formatted_result = f"{int(result)}"
-        else:
-            formatted_result = str(result)
-        
-        # Cache the result for future use
-        if len(st.session_state.calculation_cache) > 100:  # Limit cache size
-            st.session_state.calculation_cache.clear()
-        st.session_state.calculation_cache[cache_key] = formatted_result
-        
-        return formatted_result
+    # The evaluator keeps its parser state between reruns, so only the
+    # newly typed keys are processed
+    evaluator = st.session_state.preview_evaluator
+    with CancelToken(timeout=PREVIEW_TIMEOUT).activate():
+        evaluator.set_text(text)
+        preview = evaluator.preview
     
-    except Exception as e:
-        return f"Error: {str(e)}"
+    if preview is None or preview.startswith('Error') or preview == st.session_state.display:
+        return ''
+    return f"= {preview}"
 
 def button_click(value):
     """Handle button clicks with optimized performance"""
@@ -354,6 +366,7 @@ def button_click(value):
                 function_expr = f"{st.session_state.function_name}({current})"
                 st.session_state.expression = function_expr
                 result = evaluate_expression(function_expr)
+                st.session_state.history.add(function_expr, result)
                 st.session_state.display = result
                 st.session_state.function_mode = False
                 st.session_state.function_name = ''
@@ -364,6 +377,7 @@ def button_click(value):
                 
                 expr_to_evaluate = st.session_state.expression or current
                 result = evaluate_expression(expr_to_evaluate)
+                st.session_state.history.add(expr_to_evaluate, result)
                 st.session_state.display = result
             
             st.session_state.awaiting_second_operand = True
@@ -385,6 +399,7 @@ def button_click(value):
             st.session_state.expression = function_expr
             # Immediately evaluate the expression
             result = evaluate_expression(function_expr)
+            st.session_state.history.add(function_expr, result)
             if st.session_state.last_button == '=':
                 st.session_state.display = result
             else:
@@ -450,250 +465,206 @@ def button_click(value):
     
     st.session_state.awaiting_second_operand = False
 
-# Create the calculator UI with a smaller, more compact design
-st.markdown('<h2 style="text-align: center; margin-bottom: 0.5rem;">Python Calculator</h2>', unsafe_allow_html=True)
-
-# Calculator container
-st.markdown('<div class="calculator-container">', unsafe_allow_html=True)
-
-# Display area
-st.markdown(f"""
+# Keypad layout, one (label, widget key, style) entry per button. Styles map
+# to colours in BUTTON_STYLES; the CSS below is generated from this table.
+KEYPAD_ROWS = [
+    [("C", "btn_clear", "clear"), ("⌫", "btn_backspace", "clear"),
+     ("()", "btn_parentheses", "function"), ("÷", "btn_divide", "operator")],
+    [("7", "btn_7", "number"), ("8", "btn_8", "number"),
+     ("9", "btn_9", "number"), ("×", "btn_multiply", "operator")],
+    [("4", "btn_4", "number"), ("5", "btn_5", "number"),
+     ("6", "btn_6", "number"), ("-", "btn_subtract", "operator")],
+    [("1", "btn_1", "number"), ("2", "btn_2", "number"),
+     ("3", "btn_3", "number"), ("+", "btn_add", "operator")],
+    [("0", "btn_0", "number"), (".", "btn_decimal", "number"),
+     ("%", "btn_percent", "function"), ("=", "btn_equals", "equals")],
+]
+
+# Less frequently used functions, shown in an expander
+SCIENTIFIC_ROWS = [
+    [("sin", "btn_sin", "function"), ("cos", "btn_cos", "function"), ("tan", "btn_tan", "function")],
+    [("log", "btn_log", "function"), ("ln", "btn_ln", "function"), ("√", "btn_sqrt", "function")],
+    [("x²", "btn_square", "function"), ("x³", "btn_cube", "function"), ("∛", "btn_cbrt", "function")],
+    [("π", "btn_pi", "function"), ("e", "btn_e", "function"), ("!", "btn_factorial", "function")],
+]
+
+# Background colour, text colour and weight of each button style
+BUTTON_STYLES = {
+    'function': ('#4A4A4A', 'white', 'normal'),
+    'number': ('#666666', 'white', 'bold'),
+    'clear': ('#b3b3b3', 'black', 'bold'),
+    'operator': ('#FF9500', 'white', 'bold'),
+    'equals': ('#FF9500', 'white', 'bold'),
+}
+
+def keypad_css():
+    """Build the button colour rules from the keypad tables"""
+    rules = []
+    for row in KEYPAD_ROWS + SCIENTIFIC_ROWS:
+        for _, key, style in row:
+            background, color, weight = BUTTON_STYLES[style]
+            rules.append(
+                f".st-key-{key} button {{background-color: {background} !important; "
+                f"color: {color} !important; font-weight: {weight} !important;}}"
+            )
+    return "\n".join(rules)
+
+st.markdown(f"<style>\n{keypad_css()}\n</style>", unsafe_allow_html=True)
+
+# Reruns triggered inside a fragment only re-execute that fragment, so a
+# keypress doesn't rebuild the title, the stylesheets or the footer.
+# Older Streamlit versions without fragments rerun the whole script.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda function: function)
+
+def press(label):
+    """Button callback; runs before the rerun so the display is never a click behind"""
+    if label == "()":
+        # Toggle between opening and closing parenthesis
+        display = st.session_state.display
+        if '(' in display and display.count('(') > display.count(')'):
+            label = ")"
+        else:
+            label = "("
+    button_click(label)
+
+def render_keys(rows):
+    """Lay out a keypad table as rows of buttons"""
+    for row in rows:
+        for column, (label, key, _) in zip(st.columns(len(row)), row):
+            column.button(label, key=key, on_click=press, args=(label,))
+
+def handle_key_batch():
+    """Keypad component callback; replays the keys of a batch not applied yet"""
+    batch = st.session_state.keypad
+    if batch is None:
+        return
+    mount, applied = st.session_state.keys_applied
+    if batch['mount'] != mount:
+        # The keypad was loaded afresh and numbers its keys from 0 again
+        mount, applied = batch['mount'], 0
+    # Batches repeat keys until they are acknowledged, so skip those already applied
+    for label in batch['keys'][max(0, applied - batch['start']):]:
+        press(label)
+    st.session_state.keys_applied = (mount, max(applied, batch['start'] + len(batch['keys'])))
+
+def component_rows():
+    """Keypad tables in the layout the keypad component expects"""
+    rows = [[(label, style) for label, _, style in row] for row in KEYPAD_ROWS]
+    rows.append("Scientific Functions")
+    rows.extend([(label, style) for label, _, style in row] for row in SCIENTIFIC_ROWS)
+    return rows
+
+def show_display():
+    """Expression, result and live preview"""
+    st.markdown(f"""
 <div class="display-area">
     <div class="expression-display">{st.session_state.expression}</div>
     <div class="result-display">{st.session_state.display}</div>
+    <div class="preview-display">{live_preview()}</div>
 </div>
 """, unsafe_allow_html=True)
 
-# First row - Special Functions (Clear, Backspace, Parentheses, Division)
-col1, col2, col3, col4 = st.columns(4)
+def recall(expression, result):
+    """History callback; puts a past calculation back on the display"""
+    st.session_state.expression = expression
+    st.session_state.display = result
+    st.session_state.function_mode = False
+    st.session_state.function_name = ''
+    st.session_state.awaiting_second_operand = True
+    st.session_state.last_button = '='
+
+def history_panel():
+    """Past calculations of this session, searchable; clicking one recalls it"""
+    history = st.session_state.history
+    with st.expander(f"History ({len(history)})"):
+        query = st.text_input("Search", key="history_query", placeholder="e.g. sin(")
+        starts_with = st.checkbox("Starts with", key="history_prefix")
+        if starts_with and query:
+            entries = history.search_prefix(query, HISTORY_SHOWN)
+        else:
+            entries = history.search(query, HISTORY_SHOWN)
+        if not entries:
+            st.caption("No calculations yet" if not len(history) else "No matches")
+        for i, entry in enumerate(entries):
+            st.button(f"{entry.expression} = {entry.result}", key=f"history_{i}",
+                      on_click=recall, args=(entry.expression, entry.result))
+
+def debug_panel():
+    """Stage timings of engine calls; only shown when the page is opened with ?debug=1"""
+    with st.expander("Debug: stage timings"):
+        profiler = get_profiler()
+        # Timing is process-wide, so it covers every session while switched on
+        recording = st.checkbox("Record stage timings", value=timing.active_profiler() is not None,
+                                key="debug_timing")
+        if recording and timing.active_profiler() is None:
+            timing.enable(profiler)
+        elif not recording and timing.active_profiler() is not None:
+            timing.disable()
+        if st.button("Reset", key="debug_reset"):
+            profiler.clear()
+
+        summary = profiler.summary()
+        order = ('result_cache',) + timing.STAGES + ('total',)
+        rows = [dict(stage=stage, **{k: v for k, v in summary[stage].items() if k != 'buckets'})
+                for stage in order if stage in summary]
+        if rows:
+            st.dataframe(rows, hide_index=True)
+            stage = st.selectbox("Histogram", [row['stage'] for row in rows], key="debug_stage")
+            buckets = summary[stage]['buckets']
+            st.bar_chart({'under_us': list(buckets), 'calls': list(buckets.values())},
+                         x='under_us', y='calls')
+        st.json(profiler.recent()[:20], expanded=False)
+
+@fragment
+def calculator():
+    """Display and keypad; a keypress reruns only this part of the page"""
+    started = time.perf_counter()
+    # Here rather than at the top level, which keypresses do not rerun
+    get_metrics().touch_session(st.session_state.session_id)
+    if CLIENT_SIDE_KEYPAD:
+        # The component draws the display too, so it can echo pending keys
+        keypad(
+            component_rows(),
+            BUTTON_STYLES,
+            st.session_state.display,
+            st.session_state.expression,
+            live_preview(),
+            acknowledged=st.session_state.keys_applied,
+            key="keypad",
+            on_change=handle_key_batch,
+        )
+    else:
+        show_display()
 
-with col1:
-    st.markdown('<div class="clear-btn">', unsafe_allow_html=True)
-    if st.button("C", key="btn_clear"):
-        button_click("C")
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Huge results are shown as a summary; all digits are only computed on request
+    if is_summary(st.session_state.display):
+        with st.expander("Show all digits"):
+            if st.button("Compute all digits", key="btn_full_digits"):
+                digits = get_sandbox().evaluate_expression(st.session_state.expression, full=True)
+                st.text_area("All digits", digits, height=150)
 
-with col2:
-    st.markdown('<div class="clear-btn">', unsafe_allow_html=True)
-    if st.button("⌫", key="btn_backspace"):
-        button_click("⌫")
-    st.markdown('</div>', unsafe_allow_html=True)
+    if not CLIENT_SIDE_KEYPAD:
+        render_keys(KEYPAD_ROWS)
+        with st.expander("Scientific Functions"):
+            render_keys(SCIENTIFIC_ROWS)
 
-with col3:
-    st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-    if st.button("()", key="btn_parentheses"):
-        # Toggle between opening and closing parenthesis
-        if '(' in st.session_state.display and st.session_state.display.count('(') > st.session_state.display.count(')'):
-            button_click(")")
-        else:
-            button_click("(")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col4:
-    st.markdown('<div class="operator-btn">', unsafe_allow_html=True)
-    if st.button("÷", key="btn_divide"):
-        button_click("÷")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Second row - Numbers 7-9 and Multiplication
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("7", key="btn_7"):
-        button_click("7")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("8", key="btn_8"):
-        button_click("8")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col3:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("9", key="btn_9"):
-        button_click("9")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col4:
-    st.markdown('<div class="operator-btn">', unsafe_allow_html=True)
-    if st.button("×", key="btn_multiply"):
-        button_click("×")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Third row - Numbers 4-6 and Subtraction
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("4", key="btn_4"):
-        button_click("4")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("5", key="btn_5"):
-        button_click("5")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col3:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("6", key="btn_6"):
-        button_click("6")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col4:
-    st.markdown('<div class="operator-btn">', unsafe_allow_html=True)
-    if st.button("-", key="btn_subtract"):
-        button_click("-")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Fourth row - Numbers 1-3 and Addition
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("1", key="btn_1"):
-        button_click("1")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("2", key="btn_2"):
-        button_click("2")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col3:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("3", key="btn_3"):
-        button_click("3")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col4:
-    st.markdown('<div class="operator-btn">', unsafe_allow_html=True)
-    if st.button("+", key="btn_add"):
-        button_click("+")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Fifth row - Zero, Decimal Point, and Equals
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button("0", key="btn_0"):
-        button_click("0")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="number-btn">', unsafe_allow_html=True)
-    if st.button(".", key="btn_decimal"):
-        button_click(".")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col3:
-    st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-    if st.button("%", key="btn_percent"):
-        button_click("%")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col4:
-    st.markdown('<div class="equals-btn">', unsafe_allow_html=True)
-    if st.button("=", key="btn_equals"):
-        button_click("=")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Scientific Functions section - use an expander for less frequently used functions
-with st.expander("Scientific Functions"):
-    # Row 1 - Trigonometric functions
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("sin", key="btn_sin"):
-            button_click("sin")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("cos", key="btn_cos"):
-            button_click("cos")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("tan", key="btn_tan"):
-            button_click("tan")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Row 2 - Logarithmic functions
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("log", key="btn_log"):
-            button_click("log")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("ln", key="btn_ln"):
-            button_click("ln")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("√", key="btn_sqrt"):
-            button_click("√")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Row 3 - Powers and roots
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("x²", key="btn_square"):
-            button_click("x²")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("x³", key="btn_cube"):
-            button_click("x³")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("∛", key="btn_cbrt"):
-            button_click("∛")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Row 4 - Constants and factorial
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("π", key="btn_pi"):
-            button_click("π")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("e", key="btn_e"):
-            button_click("e")
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="function-btn">', unsafe_allow_html=True)
-        if st.button("!", key="btn_factorial"):
-            button_click("!")
-        st.markdown('</div>', unsafe_allow_html=True)
+    history_panel()
 
-st.markdown('</div>', unsafe_allow_html=True)  # Close calculator-container
+    if st.query_params.get('debug') == '1':
+        debug_panel()
+
+    get_metrics().reruns.observe(time.perf_counter() - started, scope='fragment')
+
+# Create the calculator UI with a smaller, more compact design
+st.markdown('<h2 style="text-align: center; margin-bottom: 0.5rem;">Python Calculator</h2>', unsafe_allow_html=True)
+
+calculator()
 
 # Footer with GitHub link
 st.markdown("""
 <div style="text-align: center; margin-top: 20px; color: gray; font-size: 12px;">
     Python Calculator | <a href="https://github.com/yourusername/python-calculator" target="_blank">GitHub Repository</a>
 </div>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+""", unsafe_allow_html=True) 
+
+get_metrics().reruns.observe(time.perf_counter() - RUN_STARTED, scope='app')
@@ -0,0 +1 @@
+"""Benchmarks for the calculator engine. Run each module with ``python -m benchmarks.<name>``."""
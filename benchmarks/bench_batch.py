@@ -0,0 +1,51 @@
+"""
+Batch evaluation benchmark.
+
+Compares evaluating an export-sized list of formulas one at a time with a
+fresh plan cache per call against calc_engine.evaluate_batch.
+
+    python -m benchmarks.bench_batch
+"""
+
+import random
+import time
+
+from calc_engine import PlanCache, evaluate_batch, plan_cache
+from calc_engine.errors import CalculationError
+from calc_engine.formatting import format_result
+
+
+def make_formulas(count, distinct, rng):
+    pool = [f"({rng.randint(1, 999)}+√({rng.randint(1, 9999)}))×ln({rng.randint(1, 99)})÷{rng.randint(0, 9)}"
+            for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def evaluate_uncached(expression):
+    try:
+        return format_result(PlanCache().get(expression).evaluate())
+    except CalculationError as e:
+        return f"Error: {e}"
+
+
+def main():
+    formulas = make_formulas(50000, 5000, random.Random(7))
+
+    start = time.perf_counter()
+    expected = [evaluate_uncached(formula) for formula in formulas]
+    loop = time.perf_counter() - start
+
+    plan_cache.clear()
+    start = time.perf_counter()
+    results = evaluate_batch(formulas)
+    batch = time.perf_counter() - start
+
+    assert results == expected
+    errors = sum(result.startswith("Error") for result in results)
+    print(f"{len(formulas)} formulas ({errors} errors)")
+    print(f"one at a time: {loop:6.2f} s")
+    print(f"evaluate_batch: {batch:6.2f} s  ({loop / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
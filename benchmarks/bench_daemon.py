@@ -0,0 +1,65 @@
+"""
+Per-call overhead of the calculator daemon (calc_daemon.py).
+
+Compares calling the engine from a fresh interpreter each time, as a
+short-lived script does, with calls through calc_client to a running
+daemon, one at a time and pipelined, and with calling the engine
+in-process.
+
+    python -m benchmarks.bench_daemon [calls]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from calc_client import CalculatorClient
+from calc_engine import evaluate_expression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_CALLS = 20
+
+
+def per_call(label, elapsed, calls):
+    print(f"{label:<24} {elapsed / calls * 1e6:12.1f} µs/call")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    expressions = [f"{i}+{i % 97}×3-√({i})" for i in range(calls)]
+
+    start = time.perf_counter()
+    for expression in expressions[:COLD_CALLS]:
+        subprocess.run([sys.executable, '-c', 'import sys; from calc_engine import evaluate_expression; '
+                        'print(evaluate_expression(sys.argv[1]))', expression],
+                       cwd=ROOT, check=True, capture_output=True)
+    per_call("new interpreter", time.perf_counter() - start, COLD_CALLS)
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'calculator.sock')
+    daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, 'calc_daemon.py'), '--socket', socket_path],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        daemon.stdout.readline()
+        with CalculatorClient(socket_path) as client:
+            client.evaluate("0")
+            start = time.perf_counter()
+            sequential = [client.evaluate(expression) for expression in expressions]
+            per_call("daemon, one at a time", time.perf_counter() - start, calls)
+
+            start = time.perf_counter()
+            pipelined = client.evaluate_many(expressions)
+            per_call("daemon, pipelined", time.perf_counter() - start, calls)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    start = time.perf_counter()
+    local = [evaluate_expression(expression) for expression in expressions]
+    per_call("in-process", time.perf_counter() - start, calls)
+    assert sequential == pipelined == local
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Result formatting benchmark.
+
+Times the display summary and full decimal conversion for ints of growing
+size. Full conversion is timed with the divide-and-conquer path, and with
+gmpy2 as well when it is installed. Decimal(value), which the conversion
+replaced, takes time quadratic in the digits, so it is only timed up to
+QUADRATIC_LIMIT digits for comparison.
+
+    python -m benchmarks.bench_formatting
+"""
+
+import decimal
+import time
+
+from calc_engine import formatting
+from calc_engine.bigfact import load_gmpy2
+from calc_engine.formatting import full_digits, summarize_int
+
+SIZES = (10**4, 10**5, 10**6, 5 * 10**6)
+QUADRATIC_LIMIT = 2 * 10**5
+
+
+def time_call(func, value, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def divide_and_conquer(value):
+    return str(formatting._to_decimal(value))
+
+
+def main():
+    columns = [('full digits (ms)', divide_and_conquer)]
+    if load_gmpy2() is not None:
+        columns.append(('with gmpy2 (ms)', full_digits))
+    print(f"{'digits':>10} {'summary (ms)':>14} {'Decimal() (ms)':>16}"
+          + ''.join(f" {label:>18}" for label, _ in columns))
+    for digits in SIZES:
+        value = 7 ** int(digits / 0.845098)  # log10(7) ~ 0.845
+        summary = time_call(summarize_int, value)
+        if digits <= QUADRATIC_LIMIT:
+            quadratic = f"{time_call(lambda v: str(decimal.Decimal(v)), value, repeat=1) * 1000:16.2f}"
+        else:
+            quadratic = f"{'skipped':>16}"
+        line = f"{digits:>10} {summary * 1000:>14.3f} {quadratic}"
+        for _, func in columns:
+            line += f" {time_call(func, value, repeat=1) * 1000:18.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Calculation history benchmark.
+
+Fills a History with distinct formulas and compares its indexed prefix and
+substring search with a linear scan over the same entries. Then fills one
+History per simulated session from a common pool of formulas and reports
+the memory they hold.
+
+    python -m benchmarks.bench_history [entries] [sessions]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from calc_engine import History
+
+FUNCTIONS = ['sin', 'cos', '√', 'ln', 'x²']
+QUERIES = ['sin(12', '(123)+', 'x²(4', '7×', '99']
+REPEAT = 20
+
+
+def make_formula(rng):
+    return (f"{rng.choice(FUNCTIONS)}({rng.randint(1, 500)})"
+            f"+{rng.randint(1, 99)}×{rng.randint(1, 9)}")
+
+
+def timed(function):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(7)
+    formulas = [make_formula(rng) for _ in range(entries)]
+
+    history = History(capacity=entries)
+    for formula in formulas:
+        history.add(formula, "0")
+    start = time.perf_counter()
+    history.search_prefix("")
+    print(f"{entries} entries; indexes built on first search in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    newest_first = formulas[::-1]
+    print(f"{'query':<10}{'scan µs':>12}{'substring µs':>14}{'prefix µs':>12}")
+    for query in QUERIES:
+        scan = timed(lambda: [f for f in newest_first if query in f][:50])
+        substring = timed(lambda: history.search(query))
+        prefix = timed(lambda: history.search_prefix(query))
+        print(f"{query:<10}{scan:12.0f}{substring:14.0f}{prefix:12.0f}")
+
+    pool = [make_formula(rng) for _ in range(500)]
+    tracemalloc.start()
+    histories = [History() for _ in range(sessions)]
+    for session in histories:
+        for _ in range(1000):
+            # Fresh strings, as parsed from each session's input
+            formula = ''.join(rng.choice(pool))
+            session.add(formula, str(len(formula)))
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{sessions} sessions x 1000 entries: {held / 2**20:.1f} MiB "
+          f"({held / sessions / 1000:.0f} bytes per entry)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Deeply nested function chain benchmark.
+
+Evaluates chains such as ``√(x²(√(x²(...2...))))`` of growing depth in a
+single pass and reports the cost per nesting level. For comparison it also
+times the strategy the engine replaced, where every function argument was
+evaluated separately for its domain check before the whole expression was
+evaluated again, which grows quadratically with depth.
+
+    python -m benchmarks.bench_nesting
+"""
+
+import time
+
+from calc_engine import PlanCache
+
+DEPTHS = (10, 100, 1000, 10000)
+PER_ARGUMENT_LIMIT = 1000
+
+
+def nested_chain(depth):
+    # √ and x² alternate so every level stays inside sqrt's domain
+    return '√(x²(' * depth + '2' + '))' * depth
+
+
+def evaluate_once(source):
+    return PlanCache().get(source).evaluate()
+
+
+def evaluate_per_argument(depth):
+    # Each argument checked on its own, innermost first, then the whole thing
+    for level in range(depth + 1):
+        evaluate_once(nested_chain(level))
+
+
+def time_call(func, arg, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'depth':>7} {'single pass (ms)':>17} {'us/level':>9} {'per-argument (ms)':>18}")
+    for depth in DEPTHS:
+        single = time_call(evaluate_once, nested_chain(depth))
+        if depth <= PER_ARGUMENT_LIMIT:
+            per_argument = f"{time_call(evaluate_per_argument, depth, repeat=1) * 1000:18.2f}"
+        else:
+            per_argument = f"{'skipped':>18}"
+        print(f"{depth:>7} {single * 1000:>17.2f} {single * 1e6 / depth:>9.2f} {per_argument}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Parallel batch benchmark.
+
+Evaluates a large list of distinct formulas on the single-process path
+(evaluate_expression in a loop) and with evaluate_parallel at increasing
+worker counts, and reports the speedup of each.
+
+    python -m benchmarks.bench_parallel [count] [chunk_size]
+"""
+
+import os
+import random
+import sys
+import time
+
+from calc_engine import evaluate_expression, evaluate_parallel
+
+
+def make_formulas(count, rng):
+    return [f"√({rng.randint(1, 10**9)})×sin({rng.randint(1, 89)})+ln({rng.randint(1, 10**6)})÷7"
+            f"-x³({rng.randint(1, 999)})"
+            for _ in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    formulas = make_formulas(count, random.Random(3))
+
+    start = time.perf_counter()
+    expected = [evaluate_expression(formula) for formula in formulas]
+    baseline = time.perf_counter() - start
+    print(f"{count} formulas, chunk size {chunk_size}")
+    print(f"single process: {baseline:7.2f} s")
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({w for w in (2, 4, cpus) if w <= cpus} | {1})
+    for workers in worker_counts:
+        start = time.perf_counter()
+        results = list(evaluate_parallel(formulas, workers=workers, chunk_size=chunk_size))
+        elapsed = time.perf_counter() - start
+        assert results == expected
+        print(f"{workers:>3} workers:    {elapsed:7.2f} s  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Parser scaling benchmark.
+
+Parses and evaluates pasted expressions of growing length and reports the
+time per token, and how far it has grown from the smallest size. The
+growth stays near 1.0x while the parser is linear. Each size is timed
+again with the cyclic garbage collector paused: its passes over the
+growing token list and tree account for much of the remaining growth. The
+engine leaves the collector alone, since pausing it affects every thread
+in the process.
+
+    python -m benchmarks.bench_parser
+"""
+
+import gc
+import time
+
+from calc_engine import evaluate, parse, tokenize
+
+# One repetition of a typical pasted formula fragment
+FRAGMENT = "√(16)+sin(30)×2-log(100)÷(1+(2-1))+"
+
+
+def build_expression(repeats):
+    return FRAGMENT * repeats + "0"
+
+
+def time_call(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def parse_and_evaluate(source):
+    return evaluate(parse(source))
+
+
+def without_gc(source):
+    gc.disable()
+    try:
+        return evaluate(parse(source))
+    finally:
+        gc.enable()
+
+
+def main():
+    print(f"{'tokens':>10} {'parse+eval (ms)':>16} {'us/token':>10} {'growth':>8}"
+          f" {'gc paused (us/token)':>21} {'growth':>8}")
+    first = first_paused = None
+    for repeats in (100, 1000, 10000, 50000):
+        source = build_expression(repeats)
+        token_count = len(tokenize(source))
+        repeat = 5 if repeats < 10000 else 2
+        per_token = time_call(parse_and_evaluate, source, repeat=repeat) * 1e6 / token_count
+        paused = time_call(without_gc, source, repeat=repeat) * 1e6 / token_count
+        first = first or per_token
+        first_paused = first_paused or paused
+        print(f"{token_count:>10} {per_token * token_count / 1000:>16.2f} {per_token:>10.3f}"
+              f" {per_token / first:>7.1f}x {paused:>21.3f} {paused / first_paused:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Plan cache benchmark.
+
+Evaluates a working set of a few hundred formulas repeatedly, once with a
+cold plan cache on every pass and once with the cache kept warm. First
+checks that spellings which normalize alike still evaluate alike.
+
+    python -m benchmarks.bench_plans
+"""
+
+import random
+import time
+
+from calc_engine import PlanCache, evaluate_expression
+from calc_engine.formatting import format_result
+
+FUNCTIONS = ['sin', 'cos', 'log', 'ln', '√', 'x²']
+
+# Each pair must not share a plan: the first is a syntax error
+DISTINCT = [('2××3', '2**3')]
+
+
+def make_formula(rng):
+    terms = [f"{rng.choice(FUNCTIONS)}({rng.randint(1, 90)})" for _ in range(6)]
+    return '+'.join(terms) + f"×{rng.randint(2, 9)}÷(1+{rng.randint(1, 9)})"
+
+
+def run(formulas, passes, cache_factory):
+    start = time.perf_counter()
+    for _ in range(passes):
+        cache = cache_factory()
+        for formula in formulas:
+            format_result(cache.get(formula).evaluate())
+    return time.perf_counter() - start
+
+
+def check_keys():
+    for invalid, valid in DISTINCT:
+        evaluate_expression(valid)
+        result = evaluate_expression(invalid)
+        assert result.startswith("Error"), f"{invalid!r} gave {result!r}"
+
+
+def main():
+    check_keys()
+    rng = random.Random(42)
+    formulas = [make_formula(rng) for _ in range(300)]
+    passes = 20
+    evaluations = len(formulas) * passes
+
+    warm_cache = PlanCache()
+    cold = run(formulas, passes, PlanCache)
+    warm = run(formulas, passes, lambda: warm_cache)
+
+    print(f"{evaluations} evaluations of {len(formulas)} formulas")
+    print(f"cold plans: {cold * 1e6 / evaluations:8.2f} us/eval")
+    print(f"warm plans: {warm * 1e6 / evaluations:8.2f} us/eval  ({cold / warm:.1f}x)")
+    print(f"warm cache: {warm_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Live preview benchmark.
+
+Types a long expression one key at a time and refreshes the preview after
+every key, once with IncrementalEvaluator and once by re-evaluating the
+whole expression from scratch, and reports the cost per key.
+
+    python -m benchmarks.bench_preview
+"""
+
+import time
+
+from calc_engine import IncrementalEvaluator, PlanCache
+from calc_engine.errors import CalculationError
+
+KEYS = ['1', '2', '×', '(', '3', '4', '+', 'sin', '3', '0', ')', ')', '-', '√', '1', '6', ')', '÷', '7', '+']
+
+
+def type_incremental(count):
+    evaluator = IncrementalEvaluator()
+    for i in range(count):
+        evaluator.push(KEYS[i % len(KEYS)])
+        evaluator.preview
+
+
+def type_from_scratch(count):
+    text = ''
+    for i in range(count):
+        key = KEYS[i % len(KEYS)]
+        text += key + '(' if key in ('sin', '√') else key
+        try:
+            PlanCache().get(text).evaluate()
+        except CalculationError:
+            pass
+
+
+def main():
+    print(f"{'keys':>7} {'incremental (us/key)':>21} {'from scratch (us/key)':>22}")
+    for count in (100, 1000, 5000):
+        start = time.perf_counter()
+        type_incremental(count)
+        incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        type_from_scratch(count)
+        scratch = time.perf_counter() - start
+        print(f"{count:>7} {incremental * 1e6 / count:>21.2f} {scratch * 1e6 / count:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Load test for the calculator HTTP API (calc_server.py).
+
+Starts the server in a subprocess, unless --url points at a running one,
+then keeps a number of keep-alive connections busy for a fixed time, each
+sending one request after another. Reports requests per second and
+latency percentiles; with --batch-size, each request is a /batch of that
+many expressions instead of a single /evaluate.
+
+    python -m benchmarks.bench_server [--connections 32] [--duration 10]
+                                      [--batch-size N] [--url http://host:port]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_expressions(rng, count):
+    return [f"{rng.randint(1, 9999)}+{rng.randint(1, 999)}×{rng.randint(1, 99)}"
+            f"-√({rng.randint(1, 10**6)})÷{rng.randint(1, 99)}"
+            for _ in range(count)]
+
+
+def start_server():
+    """Start calc_server.py on a free port; returns (process, host, port)."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(HERE), 'calc_server.py'), '--port', '0'],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = server.stdout.readline()
+    if not line.startswith("Serving on "):
+        server.kill()
+        raise SystemExit(f"Server did not start: {line!r}")
+    address = urlsplit(line.split()[-1])
+    return server, address.hostname, address.port
+
+
+async def request(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, expressions, batch_size, deadline, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(id(latencies) ^ id(reader))
+    try:
+        while time.perf_counter() < deadline:
+            if batch_size:
+                start = rng.randrange(len(expressions) - batch_size + 1)
+                path, payload = '/batch', {'expressions': expressions[start:start + batch_size]}
+            else:
+                path, payload = '/evaluate', {'expression': rng.choice(expressions)}
+            sent = time.perf_counter()
+            status = await request(reader, writer, host, path, payload)
+            latencies.append(time.perf_counter() - sent)
+            if status != 200:
+                failures[status] = failures.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(host, port, options):
+    expressions = make_expressions(random.Random(5), 10000)
+    latencies = []
+    failures = {}
+    started = time.perf_counter()
+    deadline = started + options.duration
+    await asyncio.gather(*(client(host, port, expressions, options.batch_size, deadline,
+                                  latencies, failures)
+                           for _ in range(options.connections)))
+    return latencies, failures, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the calculator HTTP API.")
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--batch-size', type=int, default=0)
+    parser.add_argument('--url', help="test a running server instead of starting one")
+    options = parser.parse_args()
+
+    server = None
+    if options.url:
+        address = urlsplit(options.url)
+        host, port = address.hostname, address.port
+    else:
+        server, host, port = start_server()
+    try:
+        latencies, failures, elapsed = asyncio.run(run(host, port, options))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    per_request = options.batch_size or 1
+    print(f"{options.connections} connections, {elapsed:.1f} s, "
+          f"{per_request} expression(s) per request")
+    print(f"requests:     {len(latencies)}  ({len(latencies) / elapsed:,.0f} req/s, "
+          f"{len(latencies) * per_request / elapsed:,.0f} expressions/s)")
+    print(f"latency ms:   p50 {percentile(latencies, 0.5) * 1000:.2f}  "
+          f"p90 {percentile(latencies, 0.9) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}  max {latencies[-1] * 1000:.2f}")
+    if failures:
+        print("non-200 responses: " + ", ".join(f"{status}: {count}" for status, count in sorted(failures.items())))
+
+
+if __name__ == "__main__":
+    main()
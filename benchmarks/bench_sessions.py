@@ -0,0 +1,64 @@
+"""
+Session cache simulation.
+
+Simulates many concurrent Streamlit sessions drawing formulas from a common
+pool and compares per-session private caches (the old behaviour) with one
+shared cache plus a small per-session overlay. Reports the memory held by
+the caches and the overall hit rate.
+
+    python -m benchmarks.bench_sessions [sessions]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from calc_engine import LayeredCache, LRUCache, engine
+
+FORMULA_POOL = 500
+REQUESTS_PER_SESSION = 200
+
+
+def make_pool(rng):
+    return [f"√({rng.randint(1, 10**6)})×sin({rng.randint(1, 89)})+!({rng.randint(1, 60)})"
+            for _ in range(FORMULA_POOL)]
+
+
+def simulate(sessions, cache_factory, pool):
+    rng = random.Random(1)
+    tracemalloc.start()
+    caches = [cache_factory() for _ in range(sessions)]
+    misses = lookups = 0
+
+    def compute(formula):
+        nonlocal misses
+        misses += 1
+        return engine.evaluate_expression(formula)
+
+    for _ in range(REQUESTS_PER_SESSION):
+        for cache in caches:
+            # Popular formulas are requested far more often than the rest
+            formula = pool[min(int(rng.paretovariate(1.2)) - 1, FORMULA_POOL - 1)]
+            cache.get_or_compute(('expr', formula), lambda: compute(formula))
+            lookups += 1
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, 1 - misses / lookups
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pool = make_pool(random.Random(0))
+
+    private = simulate(sessions, lambda: LRUCache(capacity=256), pool)
+    shared_cache = LRUCache(capacity=4096)
+    layered = simulate(sessions, lambda: LayeredCache(shared_cache, LRUCache(capacity=32)), pool)
+
+    print(f"{sessions} sessions x {REQUESTS_PER_SESSION} requests")
+    for name, (memory, hit_rate) in (("private per session", private),
+                                     ("shared + overlay", layered)):
+        print(f"{name:>20}: {memory / 1024:10.1f} KiB   hit rate {hit_rate:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
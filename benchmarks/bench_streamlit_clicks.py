@@ -0,0 +1,127 @@
+"""
+Streamlit keypress benchmark.
+
+Drives the web app headlessly with streamlit.testing's AppTest, one
+simulated user per process so that concurrent users compete for the CPU as
+they would on a shared server. Each user types the same calculations; the
+benchmark reports the server time per request and the size of the elements
+the app renders per request.
+
+AppTest cannot send values from custom components, so the app is run with
+plain Streamlit buttons (CALCULATOR_CLIENT_KEYPAD=0), one request per key.
+How many requests the client-side keypad sends for the same calculations is
+worked out by replaying its batching rules (keys go at once for FLUSH_KEYS,
+otherwise after DEBOUNCE_MS without typing) for keys typed --key-interval
+milliseconds apart.
+
+To compare against an earlier revision, export its app and pass the path:
+
+    git show <rev>:app.py > /tmp/app_before.py
+    python -m benchmarks.bench_streamlit_clicks /tmp/app_before.py [users]
+    python -m benchmarks.bench_streamlit_clicks app.py [users] [--key-interval 250]
+
+AppTest always reruns the whole script, so for the fragment-based app the
+time per request is an upper bound; in a browser only the fragment reruns.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from keypad_component import DEBOUNCE_MS, FLUSH_KEYS
+
+# Keys as typed; a digit after "=" starts a new calculation, as on the keypad
+CALCULATIONS = [
+    ['7', '×', '8', '+', '1', '2', '÷', '4', '='],
+    ['1', '2', '3', '4', '.', '5', '×', '6', '7', '8', '='],
+    ['2', '5', '6', '-', '1', '9', '9', '9', '+', '3', '.', '1', '4', '='],
+    ['√', '9', '='],
+]
+ROUNDS = 5
+
+BUTTON_KEYS = {
+    **{digit: f'btn_{digit}' for digit in '0123456789'},
+    '.': 'btn_decimal', '+': 'btn_add', '-': 'btn_subtract', '×': 'btn_multiply',
+    '÷': 'btn_divide', '=': 'btn_equals', 'C': 'btn_clear', '√': 'btn_sqrt',
+}
+
+
+def payload_size(node):
+    """Serialized size in bytes of the element protos below an AppTest node."""
+    proto = getattr(node, 'proto', None)
+    size = proto.ByteSize() if proto is not None and hasattr(proto, 'ByteSize') else 0
+    children = getattr(node, 'children', None) or {}
+    for child in children.values():
+        size += payload_size(child)
+    return size
+
+
+def keypad_requests(keys, interval_ms):
+    """Batches the keypad component sends for keys typed interval_ms apart."""
+    requests = 0
+    pending = 0
+    for key in keys:
+        if pending and interval_ms >= DEBOUNCE_MS:
+            # Typing paused long enough for the pending keys to go
+            requests += 1
+            pending = 0
+        pending += 1
+        if key in FLUSH_KEYS:
+            requests += 1
+            pending = 0
+    return requests + (1 if pending else 0)
+
+
+def run_user(app_path):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(app_path, default_timeout=30)
+    app.run()
+    timings = []
+    payloads = []
+    for _ in range(ROUNDS):
+        for keys in CALCULATIONS:
+            for key in keys:
+                start = time.perf_counter()
+                app.button(key=BUTTON_KEYS[key]).click().run()
+                timings.append(time.perf_counter() - start)
+                payloads.append(payload_size(app._tree))
+    return timings, payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keypresses in the Streamlit app")
+    parser.add_argument('app', nargs='?', default='app.py', help="app script to drive (default: app.py)")
+    parser.add_argument('users', nargs='?', type=int, default=4, help="concurrent simulated users (default: 4)")
+    parser.add_argument('--key-interval', type=float, default=250,
+                        help="milliseconds between keys for the keypad estimate (default: 250)")
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+
+    # Inherited by the worker processes; older apps without the switch ignore it
+    os.environ['CALCULATOR_CLIENT_KEYPAD'] = '0'
+    with ProcessPoolExecutor(max_workers=args.users) as pool:
+        results = list(pool.map(run_user, [app_path] * args.users))
+
+    timings = sorted(t for user_timings, _ in results for t in user_timings)
+    payloads = [p for _, user_payloads in results for p in user_payloads]
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    keys = sum(len(calculation) for calculation in CALCULATIONS)
+    batches = sum(keypad_requests(calculation, args.key_interval) for calculation in CALCULATIONS)
+    per_request = statistics.mean(timings)
+    print(f"{app_path}: {args.users} concurrent users x {keys * ROUNDS} keys "
+          f"({len(CALCULATIONS) * ROUNDS} calculations)")
+    print(f"  per request: mean {per_request * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+    print(f"  rendered elements: mean {statistics.mean(payloads) / 1024:7.1f} KiB per request")
+    print("  requests per calculation:")
+    print(f"    plain buttons    {keys / len(CALCULATIONS):5.2f}"
+          f"   server time {keys * per_request * 1000 / len(CALCULATIONS):8.2f} ms")
+    print(f"    keypad component {batches / len(CALCULATIONS):5.2f}"
+          f"   server time {batches * per_request * 1000 / len(CALCULATIONS):8.2f} ms (estimated)"
+          f"   {keys / batches:.1f}x fewer requests at {args.key_interval:g} ms per key")
+
+
+if __name__ == "__main__":
+    main()
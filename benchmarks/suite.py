@@ -0,0 +1,243 @@
+"""
+Benchmark suite for the evaluation paths of both front ends.
+
+Runs categorised workloads through the logic behind app.py's
+evaluate_expression (the engine behind a layered result cache, without
+Streamlit), the desktop app's path through PyQtCalculator.run_calculation
+(pyqt_calculator.evaluate_expression, which needs PyQt5 installed but no
+window) and calculate_factorial. Inputs are generated from fixed seeds, so
+every run measures the same work. Cases that cannot run here are listed as
+skipped in the results.
+
+For each case it reports throughput and latency percentiles, and can write
+them as JSON. Given a baseline written by an earlier run, it exits with
+status 1 when any case has slowed down by more than the threshold.
+
+    python -m benchmarks.suite [--output results.json] [--baseline old.json]
+                               [--threshold 0.25] [--repeat 3]
+"""
+
+import argparse
+import importlib.util
+import json
+import platform
+import random
+import sys
+import time
+
+from calc_engine import CancelToken, LayeredCache, LRUCache, engine, plan_cache
+
+# Mirrors the cache configuration in app.py
+SHARED_CACHE_CAPACITY = 4096
+SESSION_CACHE_CAPACITY = 32
+CALCULATION_TIMEOUT = 10
+
+FUNCTIONS = ['sin', 'cos', 'tan', 'log', 'ln', '√', 'x²', '∛']
+
+
+class AppEvaluator:
+    """app.py's evaluation path: a layered result cache in front of the engine."""
+
+    def __init__(self):
+        self.cache = LayeredCache(LRUCache(capacity=SHARED_CACHE_CAPACITY),
+                                  LRUCache(capacity=SESSION_CACHE_CAPACITY))
+
+    def evaluate_expression(self, expression):
+        return self.cache.get_or_compute(
+            ('expr', expression),
+            lambda: engine.evaluate_expression(expression, CancelToken(timeout=CALCULATION_TIMEOUT)),
+        )
+
+    def calculate_factorial(self, value):
+        return self.cache.get_or_compute(
+            ('fact', str(value)),
+            lambda: engine.calculate_factorial(value, CancelToken(timeout=CALCULATION_TIMEOUT)),
+        )
+
+
+def arithmetic(rng, count):
+    return [f"{rng.randint(1, 9999)}+{rng.randint(1, 999)}×{rng.randint(1, 99)}"
+            f"-{rng.randint(1, 9999)}÷{rng.randint(1, 99)}"
+            for _ in range(count)]
+
+
+def nested(rng, count):
+    formulas = []
+    for _ in range(count):
+        depth = rng.randint(3, 8)
+        names = [rng.choice(FUNCTIONS) for _ in range(depth)]
+        formulas.append('('.join(names) + f"({rng.randint(1, 89)}" + ')' * depth)
+    return formulas
+
+
+def long_expressions(rng, count):
+    # Pasted sums of a few hundred terms
+    return ['+'.join(f"{rng.randint(1, 999)}×{rng.randint(1, 9)}" for _ in range(300))
+            for _ in range(count)]
+
+
+def factorials(rng, count):
+    sizes = (100, 1000, 5000, 20000)
+    return [rng.choice(sizes) + rng.randint(0, 50) for _ in range(count)]
+
+
+def hot_set(rng, count):
+    # A handful of formulas requested over and over
+    pool = arithmetic(rng, 20)
+    return [rng.choice(pool) for _ in range(count)]
+
+
+class Case:
+    """One benchmark: a function applied to generated inputs.
+
+    With ``cold`` set, every call starts from an empty plan cache and a new
+    result cache; resetting them is not counted in the timings.
+    """
+
+    def __init__(self, name, inputs, make_target, method, cold=False):
+        self.name = name
+        self.inputs = inputs
+        self.make_target = make_target
+        self.method = method
+        self.cold = cold
+
+    def run(self):
+        target = self.make_target()
+        latencies = []
+        clock = time.perf_counter_ns
+        for value in self.inputs:
+            if self.cold:
+                plan_cache.clear()
+                target = self.make_target()
+            function = getattr(target, self.method)
+            start = clock()
+            function(value)
+            latencies.append(clock() - start)
+        return latencies
+
+
+def desktop_target():
+    """The pyqt_calculator module, or the reason its cases cannot run here."""
+    if importlib.util.find_spec('PyQt5') is None:
+        return None, "PyQt5 is not installed"
+    try:
+        import pyqt_calculator
+    except ImportError as e:
+        return None, f"pyqt_calculator cannot be imported: {e}"
+    for method in ('evaluate_expression', 'calculate_factorial'):
+        if not callable(getattr(pyqt_calculator, method, None)):
+            return None, f"pyqt_calculator has no headless {method}()"
+    return pyqt_calculator, None
+
+
+def make_cases(scale):
+    """Return the cases to run, and a reason for each case that is skipped."""
+    rng = random.Random(2024)
+    cases = []
+    skipped = {}
+    targets = [('app', AppEvaluator)]
+    desktop, reason = desktop_target()
+    if desktop is not None:
+        targets.append(('pyqt', lambda: desktop))
+
+    def add(name, inputs, method):
+        for target, factory in targets:
+            cases.append(Case(f"{name}/{target}", inputs, factory, method))
+        if desktop is None:
+            skipped[f"{name}/pyqt"] = reason
+
+    add('arithmetic', arithmetic(rng, 2000 * scale), 'evaluate_expression')
+    add('nested', nested(rng, 1000 * scale), 'evaluate_expression')
+    add('long', long_expressions(rng, 50 * scale), 'evaluate_expression')
+    add('factorial', factorials(rng, 20 * scale), 'calculate_factorial')
+
+    # Only the app keeps a result cache
+    cases.append(Case('cache_hot/app', hot_set(rng, 5000 * scale), AppEvaluator, 'evaluate_expression'))
+    cases.append(Case('cache_cold/app', arithmetic(rng, 1000 * scale), AppEvaluator,
+                      'evaluate_expression', cold=True))
+    return cases, skipped
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        'calls': len(ordered),
+        'ops_per_sec': len(ordered) / (total / 1e9) if total else float('inf'),
+        'p50_us': percentile(ordered, 0.50) / 1000,
+        'p90_us': percentile(ordered, 0.90) / 1000,
+        'p99_us': percentile(ordered, 0.99) / 1000,
+        'max_us': ordered[-1] / 1000,
+    }
+
+
+def run_suite(repeat, scale):
+    """Run every case; returns the results and the skipped cases with their reasons."""
+    results = {}
+    cases, skipped = make_cases(scale)
+    for case in cases:
+        # The fastest of several runs is the least disturbed by other load
+        runs = [summarize(case.run()) for _ in range(repeat)]
+        best = max(runs, key=lambda run: run['ops_per_sec'])
+        results[case.name] = best
+        print(f"{case.name:>20}: {best['ops_per_sec']:12.0f} ops/s   p50 {best['p50_us']:10.1f} us"
+              f"   p90 {best['p90_us']:10.1f} us   p99 {best['p99_us']:10.1f} us")
+    for name, reason in skipped.items():
+        print(f"{name:>20}: skipped ({reason})")
+    return results, skipped
+
+
+def find_regressions(results, baseline, threshold):
+    """Return a description of every case slower than the baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        throughput = old['ops_per_sec'] / result['ops_per_sec'] - 1
+        latency = result['p50_us'] / old['p50_us'] - 1 if old['p50_us'] else 0
+        if throughput > threshold or latency > threshold:
+            regressions.append(f"{name}: throughput {-throughput:+.1%}, p50 latency {latency:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the calculator benchmark suite")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default: 0.25 for 25%%)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case; the best one counts")
+    parser.add_argument('--scale', type=int, default=1, help="multiply the number of inputs per case")
+    args = parser.parse_args()
+
+    results, skipped = run_suite(args.repeat, args.scale)
+
+    if args.output:
+        report = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'results': results,
+            'skipped': skipped,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
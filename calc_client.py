@@ -0,0 +1,150 @@
+"""
+Client for the calculator daemon (calc_daemon.py).
+
+Imports nothing beyond the standard library's socket and json modules, so
+a short-lived script pays only for those and a round trip over a Unix
+socket, not for loading the engine:
+
+    from calc_client import CalculatorClient
+
+    with CalculatorClient() as calculator:
+        calculator.evaluate("2+3×4")                 # '14'
+        calculator.factorial(20)                     # '2432902008176640000'
+        calculator.evaluate_many(formulas)           # pipelined, results in order
+
+Connections are kept open in a pool and shared safely between threads.
+evaluate_many() pipelines: it writes a window of requests before reading
+any replies, so a long list costs a few round trips rather than one each.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+
+# Where the daemon listens unless told otherwise
+DEFAULT_SOCKET = os.environ.get('CALCULATOR_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or '/tmp',
+    f"python_calculator-{os.getuid()}.sock" if hasattr(os, 'getuid') else "python_calculator.sock",
+)
+
+# Requests written by evaluate_many() before their replies are read; kept
+# below the daemon's per-connection limit so neither side stalls
+PIPELINE_WINDOW = 128
+
+
+class ServerError(Exception):
+    """The daemon refused a request; ``status`` follows HTTP (400, 503, ...)."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Connection:
+    __slots__ = ('sock', 'reader')
+
+    def __init__(self, path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile('rb')
+
+    def exchange(self, requests):
+        """Send requests as one write, then read one reply for each."""
+        self.sock.sendall(b''.join(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n'
+                                   for request in requests))
+        replies = []
+        for _ in requests:
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("Calculator daemon closed the connection")
+            replies.append(json.loads(line))
+        return replies
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class CalculatorClient:
+    """A pool of up to ``pool_size`` persistent connections to the daemon.
+
+    ``timeout`` is the time in seconds to wait for the daemon per socket
+    operation; None waits indefinitely. Calculation failures come back as
+    ``"Error: ..."`` strings, as from the engine; refused requests raise
+    ServerError and an unreachable daemon raises OSError.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, pool_size=4, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _exchange(self, requests):
+        with self._slots:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = _Connection(self.path, self.timeout), False
+            try:
+                replies = connection.exchange(requests)
+            except (OSError, ValueError) as e:
+                connection.close()
+                if not reused or isinstance(e, TimeoutError):
+                    raise
+                # The pooled connection went stale, e.g. the daemon restarted
+                connection = _Connection(self.path, self.timeout)
+                try:
+                    replies = connection.exchange(requests)
+                except (OSError, ValueError):
+                    connection.close()
+                    raise
+            self._idle.put(connection)
+        for reply in replies:
+            if 'status' in reply:
+                raise ServerError(reply['status'], reply.get('message', ''))
+        return replies
+
+    def evaluate(self, expression, full=False):
+        """Evaluate an expression and return the display string."""
+        return self._exchange([{'op': 'evaluate', 'expression': expression, 'full': full}])[0]['result']
+
+    def factorial(self, value, full=False):
+        """Factorial of a display value, as a display string."""
+        return self._exchange([{'op': 'factorial', 'value': str(value), 'full': full}])[0]['result']
+
+    def evaluate_batch(self, expressions, full=False):
+        """Evaluate a list of expressions in one request; results in order."""
+        reply = self._exchange([{'op': 'batch', 'expressions': list(expressions), 'full': full}])[0]
+        return [item['result'] for item in reply['results']]
+
+    def evaluate_many(self, expressions, full=False):
+        """Evaluate expressions with pipelined requests; results in order."""
+        expressions = list(expressions)
+        results = []
+        for start in range(0, len(expressions), PIPELINE_WINDOW):
+            requests = [{'op': 'evaluate', 'expression': expression, 'full': full}
+                        for expression in expressions[start:start + PIPELINE_WINDOW]]
+            results.extend(reply['result'] for reply in self._exchange(requests))
+        return results
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
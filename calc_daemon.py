@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Calculator daemon
+-----------------
+Keeps the calculation engine loaded in a long-lived process listening on a
+Unix domain socket, so scripts that call the calculator often pay neither
+interpreter startup nor engine import per call. Use calc_client to talk
+to it:
+
+    python calc_daemon.py [--socket PATH]
+
+The protocol is newline-delimited JSON. Each request line is an object
+with an "op" of "evaluate", "factorial" or "batch" and the same fields as
+the matching calc_server.py endpoint; the reply line carries the same
+payload. A refused request gets {"status": <HTTP status>, "message": ...}.
+An "id" in a request is copied to its reply. Requests may be pipelined:
+replies come back in request order.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from collections import deque
+
+from calc_client import DEFAULT_SOCKET
+from calc_server import CALCULATION_MEMORY_LIMIT, CALCULATION_TIMEOUT, MAX_BODY, MAX_PENDING, CalculatorService, call
+
+logger = logging.getLogger(__name__)
+
+# Requests read from one connection but not yet answered; past this the
+# daemon stops reading from the connection until replies are sent
+MAX_IN_FLIGHT = 256
+
+
+async def respond(service, line):
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return {'status': 400, 'message': "Request must be a JSON object"}
+    if not isinstance(data, dict):
+        return {'status': 400, 'message': "Request must be a JSON object"}
+    status, payload = await call(service, data.get('op'), data)
+    reply = payload if status == 200 else {'status': status, **payload}
+    if 'id' in data:
+        reply['id'] = data['id']
+    return reply
+
+
+def _encode(reply):
+    return json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def _reply(task):
+    """The reply line of a finished request; one that failed gets a 500 reply."""
+    try:
+        return _encode(task.result())
+    except (asyncio.CancelledError, Exception):
+        # call() answers failed calculations itself, so this is a bug or shutdown
+        logger.exception("Request failed")
+        return _encode({'status': 500, 'message': "Internal error"})
+
+
+async def handle_connection(service, reader, writer):
+    # Replies in request order; each is written once it and all before it are done
+    in_flight = deque()
+
+    def flush(_=None):
+        ready = []
+        while in_flight and in_flight[0].done():
+            ready.append(_reply(in_flight.popleft()))
+        if ready and not writer.is_closing():
+            # Replies that are ready together go out in one write
+            writer.write(b''.join(ready))
+
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Longer than the stream limit; the rest of the line is unreadable
+                if in_flight:
+                    await asyncio.wait(in_flight)
+                writer.write(_encode({'status': 413, 'message': f"Request larger than {MAX_BODY} bytes"}))
+                break
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.ensure_future(respond(service, line))
+            task.add_done_callback(flush)
+            in_flight.append(task)
+            if len(in_flight) >= MAX_IN_FLIGHT:
+                # Stop reading until the oldest request is answered
+                await asyncio.wait([in_flight[0]])
+            await writer.drain()
+        if in_flight:
+            await asyncio.wait(in_flight)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        for task in in_flight:
+            task.remove_done_callback(flush)
+        writer.close()
+
+
+def _remove_stale_socket(path):
+    """Remove a socket file left behind by a daemon that is no longer running."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise SystemExit(f"A calculator daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+async def serve(service, path=DEFAULT_SOCKET):
+    _remove_stale_socket(path)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: handle_connection(service, reader, writer), path, limit=MAX_BODY)
+    os.chmod(path, 0o600)
+    # Stop cleanly on SIGTERM too, so the socket file is removed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    print(f"Listening on {path}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the calculator engine on a Unix socket.")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f"socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="worker processes for expensive calculations (default: 2)")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help=f"expensive calculations queued before refusing more (default: {MAX_PENDING})")
+    parser.add_argument('--timeout', type=float, default=CALCULATION_TIMEOUT,
+                        help=f"seconds allowed per calculation (default: {CALCULATION_TIMEOUT})")
+    parser.add_argument('--memory-limit', type=int, default=CALCULATION_MEMORY_LIMIT >> 20,
+                        help=f"MiB of memory per worker process (default: {CALCULATION_MEMORY_LIMIT >> 20})")
+    options = parser.parse_args(argv)
+    if options.workers < 1 or options.max_pending < 1:
+        parser.error("--workers and --max-pending must be at least 1")
+
+    service = CalculatorService(timeout=options.timeout, memory_limit=options.memory_limit << 20,
+                                workers=options.workers, max_pending=options.max_pending)
+    try:
+        asyncio.run(serve(service, options.socket))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Calculator engine: parsing, evaluation and formatting of calculator
+expressions, independent of any user interface.
+"""
+
+import importlib
+
+from .batch import evaluate_batch, evaluate_parallel, iter_evaluate
+from .bigfact import big_factorial
+from .cache import LayeredCache, LRUCache
+from .cancellation import CancelToken, is_interrupted
+from .engine import calculate_factorial, evaluate_expression
+from .errors import CalculationError
+from .evaluator import evaluate, factorial
+from .formatting import format_result, is_summary
+from .history import History
+from .incremental import IncrementalEvaluator
+from .metrics import MetricsRegistry, error_category
+from .parser import parse, tokenize
+from .plans import Plan, PlanCache, compile_expression, plan_cache
+from .timing import Profiler
+
+# Imported on first use, like ProcessPoolExecutor in evaluate_parallel:
+# sqlite3 and multiprocessing would take most of the package's import time,
+# and only some front ends need them
+_LAZY = {'PersistentCache': 'persistent', 'Sandbox': 'sandbox'}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = [
+    'CalculationError',
+    'CancelToken',
+    'History',
+    'IncrementalEvaluator',
+    'LayeredCache',
+    'LRUCache',
+    'MetricsRegistry',
+    'PersistentCache',
+    'Plan',
+    'PlanCache',
+    'Profiler',
+    'Sandbox',
+    'big_factorial',
+    'calculate_factorial',
+    'compile_expression',
+    'error_category',
+    'evaluate',
+    'evaluate_batch',
+    'evaluate_expression',
+    'evaluate_parallel',
+    'factorial',
+    'format_result',
+    'is_interrupted',
+    'is_summary',
+    'iter_evaluate',
+    'parse',
+    'plan_cache',
+    'tokenize',
+]
@@ -0,0 +1,92 @@
+"""
+Batch evaluation of many expressions.
+
+Results come back in input order as display strings; a failing expression
+produces its ``"Error: ..."`` string in place rather than stopping the batch.
+Identical inputs are evaluated once, and every expression goes through the
+shared plan cache. With a ``timeout``, each expression gets that many
+seconds and otherwise produces ``"Error: Calculation timed out"``.
+"""
+
+import itertools
+import os
+from collections import OrderedDict, deque
+
+from .cancellation import CancelToken
+from .engine import evaluate_expression
+
+_MISSING = object()
+
+
+def _evaluate_item(expression, timeout=None):
+    try:
+        return evaluate_expression(expression, CancelToken(timeout=timeout) if timeout else None)
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def evaluate_batch(expressions, timeout=None):
+    """Evaluate an iterable of expressions and return a list of results in order."""
+    seen = {}
+    results = []
+    append = results.append
+    for expression in expressions:
+        result = seen.get(expression, _MISSING)
+        if result is _MISSING:
+            result = seen[expression] = _evaluate_item(expression, timeout)
+        append(result)
+    return results
+
+
+def iter_evaluate(expressions, dedupe_capacity=4096, timeout=None):
+    """Lazily yield results in order, using constant memory.
+
+    Duplicates are only detected among the last ``dedupe_capacity`` distinct
+    inputs, so arbitrarily long streams can be processed.
+    """
+    # A private OrderedDict rather than an LRUCache: no locking is needed here
+    recent = OrderedDict()
+    for expression in expressions:
+        result = recent.get(expression, _MISSING)
+        if result is _MISSING:
+            result = recent[expression] = _evaluate_item(expression, timeout)
+            if len(recent) > dedupe_capacity:
+                recent.popitem(last=False)
+        else:
+            recent.move_to_end(expression)
+        yield result
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_parallel(expressions, workers=None, chunk_size=1000, timeout=None):
+    """Lazily yield results in order, spreading chunks over a process pool.
+
+    ``workers`` defaults to the CPU count. Each worker process keeps its own
+    plan cache warm across the chunks it handles. At most two chunks per
+    worker are in flight, so memory stays bounded for long inputs.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from iter_evaluate(expressions, timeout=timeout)
+        return
+
+    # Imported here: concurrent.futures.process alone makes up half the
+    # package's import time, and the front ends never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunked(expressions, chunk_size):
+            pending.append(pool.submit(evaluate_batch, chunk, timeout))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,74 @@
+"""
+Factorial engine for arguments far beyond the float range.
+
+The odd part of n! is built by binary splitting over odd factors and the
+power of two is applied with a single shift, the same scheme
+math.factorial uses, but written so that the active CancelToken is checked
+between multiplications. Large factorials can therefore be cancelled or
+time out instead of blocking until done.
+
+When the optional gmpy2 package is installed the products are gmpy2.mpz
+values, which GMP multiplies far faster than Python ints; the splitting and
+cancellation checks are the same either way. gmpy2 is imported on the
+first factorial that needs it, since importing it takes longer than
+importing the rest of the engine.
+"""
+
+import math
+
+from .cancellation import check_cancelled
+
+# Below this math.factorial finishes in well under a millisecond
+_DIRECT_LIMIT = 20000
+
+# Number of odd factors multiplied directly at the leaves of the split
+_LEAF_SIZE = 128
+
+# The gmpy2 module, None if it is not installed, or _UNLOADED before the first try
+_UNLOADED = object()
+_gmpy2 = _UNLOADED
+
+
+def load_gmpy2():
+    """Return the optional gmpy2 module, or None if it is not installed."""
+    global _gmpy2
+    if _gmpy2 is _UNLOADED:
+        try:
+            import gmpy2
+        except ImportError:
+            gmpy2 = None
+        _gmpy2 = gmpy2
+    return _gmpy2
+
+
+def _odd_product(a, b, big):
+    """Product of the odd numbers 2i+1 for i in range(a, b), as type big."""
+    if b - a <= _LEAF_SIZE:
+        return big(math.prod(range(2 * a + 1, 2 * b, 2)))
+    mid = (a + b) // 2
+    left = _odd_product(a, mid, big)
+    right = _odd_product(mid, b, big)
+    check_cancelled()
+    return left * right
+
+
+def big_factorial(n):
+    """Return n! for a non-negative int n.
+
+    Raises CalculationError if the active CancelToken is cancelled or times
+    out while the product is being built.
+    """
+    if n < _DIRECT_LIMIT:
+        return math.factorial(n)
+    # n! = oddpart(n!) * 2**(n - popcount(n)), where the odd part is the
+    # product over k of (odd numbers <= n >> k)
+    gmpy2 = load_gmpy2()
+    big = gmpy2.mpz if gmpy2 is not None else int
+    inner = outer = big(1)
+    for shift in range(n.bit_length() - 1, -1, -1):
+        upper = n >> shift
+        lower = n >> (shift + 1)
+        inner *= _odd_product((lower + 1) // 2, (upper + 1) // 2, big)
+        outer *= inner
+        check_cancelled()
+    return int(outer << (n - bin(n).count('1')))
@@ -0,0 +1,66 @@
+"""
+Cooperative cancellation for long-running calculations.
+
+A CancelToken is activated around a calculation; expensive steps such as
+big factorials call check_cancelled() between chunks of work, which raises
+CalculationError once the token is cancelled or its deadline has passed.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from .errors import CalculationError
+
+_active_token = contextvars.ContextVar('calc_engine_cancel_token', default=None)
+
+
+class CancelToken:
+    """Cancellation flag with an optional deadline, shareable across threads."""
+
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Ask the calculation using this token to stop."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise CalculationError if cancelled or past the deadline."""
+        if self._cancelled.is_set():
+            raise CalculationError("Calculation cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise CalculationError("Calculation timed out")
+
+    @contextmanager
+    def activate(self):
+        """Make this the token checked by check_cancelled() in the current context."""
+        reset = _active_token.set(self)
+        try:
+            yield self
+        finally:
+            _active_token.reset(reset)
+
+
+def check_cancelled():
+    """Raise CalculationError if the active token, if any, asks to stop."""
+    token = _active_token.get()
+    if token is not None:
+        token.check()
+
+
+def is_interrupted(result):
+    """Whether a display string reports a calculation stopped before it finished.
+
+    That is one cancelled, timed out, out of memory or whose worker process
+    failed. Such results depend on timing and load rather than on the input
+    and must not be cached.
+    """
+    return result in ("Error: Calculation cancelled", "Error: Calculation timed out",
+                      "Error: Not enough memory", "Error: Calculation failed")
@@ -0,0 +1,92 @@
+"""
+String-in, string-out entry points shared by the Streamlit and PyQt front ends.
+
+Both functions return the text to show on the calculator display; failures
+come back as ``"Error: <message>"`` strings instead of exceptions. Passing a
+CancelToken bounds the time spent on big factorials and lets another thread
+cancel the calculation.
+"""
+
+from contextlib import nullcontext
+
+from . import timing
+from .errors import CalculationError
+from .evaluator import factorial
+from .formatting import format_result
+from .plans import compile_expression
+
+
+def evaluate_expression(expression, cancel_token=None, full=False):
+    """Evaluate a calculator expression and return the display string.
+
+    Huge integer results are summarized unless ``full`` is true.
+    """
+    if not expression:
+        return "0"
+    profiler = timing.active_profiler()
+    if profiler is not None:
+        with profiler.measure('expr', expression) as record:
+            record.result = _evaluate_timed(expression, cancel_token, full, record)
+            return record.result
+    try:
+        with cancel_token.activate() if cancel_token is not None else nullcontext():
+            return format_result(compile_expression(expression).evaluate(), full=full)
+    except CalculationError as e:
+        return f"Error: {e}"
+
+
+def _evaluate_timed(expression, cancel_token, full, record):
+    """evaluate_expression() with each stage charged to a CallTiming record."""
+    stage = 'cache'
+    try:
+        with cancel_token.activate() if cancel_token is not None else nullcontext():
+            plan = compile_expression(expression)
+            record.lap(stage)
+            stage = 'evaluate'
+            value = plan.evaluate()
+            record.lap(stage)
+            stage = 'format'
+            display = format_result(value, full=full)
+            record.lap(stage)
+            return display
+    except CalculationError as e:
+        # Charge the stage that failed too
+        record.lap(stage)
+        return f"Error: {e}"
+
+
+def calculate_factorial(input_value, cancel_token=None, full=False):
+    """Calculate the factorial of a display value and return the display string.
+
+    Huge results are summarized unless ``full`` is true.
+    """
+    try:
+        num = float(input_value)
+    except (TypeError, ValueError):
+        return "Error: Invalid Input"
+    profiler = timing.active_profiler()
+    if profiler is not None:
+        with profiler.measure('fact', input_value) as record:
+            record.result = _factorial_timed(num, cancel_token, full, record)
+            return record.result
+    try:
+        with cancel_token.activate() if cancel_token is not None else nullcontext():
+            return format_result(factorial(num), full=full)
+    except CalculationError as e:
+        return f"Error: {e}"
+
+
+def _factorial_timed(num, cancel_token, full, record):
+    """calculate_factorial() with each stage charged to a CallTiming record."""
+    stage = 'evaluate'
+    try:
+        with cancel_token.activate() if cancel_token is not None else nullcontext():
+            value = factorial(num)
+            record.lap(stage)
+            stage = 'format'
+            display = format_result(value, full=full)
+            record.lap(stage)
+            return display
+    except CalculationError as e:
+        record.lap(stage)
+        return f"Error: {e}"
@@ -0,0 +1,11 @@
+"""
+Error type shared by the calculator engine.
+"""
+
+
+class CalculationError(Exception):
+    """Raised when an expression cannot be parsed or evaluated.
+
+    The message is what the front ends show after the ``Error: `` prefix,
+    e.g. ``CalculationError("Division by zero")``.
+    """
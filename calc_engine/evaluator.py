@@ -0,0 +1,250 @@
+"""
+Evaluator for syntax trees produced by calc_engine.parser.
+
+Trees are compiled into nested closures, which can be kept and run again
+without re-parsing (see calc_engine.plans). Evaluation walks the tree
+once. Domain checks (negative square roots, logarithms of non-positive
+numbers, undefined tangents, bad factorial arguments) happen on the
+argument values as they are computed, so no subexpression is evaluated
+twice.
+"""
+
+import math
+import operator
+
+from . import timing
+from .bigfact import big_factorial
+from .errors import CalculationError
+from .parser import Call, Chain, Negate, Number, Percent, Power
+
+# Largest factorial argument accepted; results are exact big integers
+MAX_FACTORIAL = 10_000_000
+
+# Largest integer result, in bits (about 80 million digits, 32 MiB), that a
+# factorial or multiplication may produce. Sizes are estimated up front, so
+# oversized results are refused before any work is done.
+MAX_RESULT_BITS = 2 ** 28
+
+# Integer powers cannot be cancelled once started, so they get a tighter
+# bound: about 2.5 million digits, roughly a second of work
+MAX_POWER_BITS = 2 ** 23
+
+_LN_2 = math.log(2)
+
+
+def _sqrt(x):
+    if x < 0:
+        raise CalculationError("Cannot find square root of negative number")
+    return math.sqrt(x)
+
+
+def _cbrt(x):
+    # x ** (1/3) would give a complex number for negative x
+    return math.copysign(abs(x) ** (1 / 3), x)
+
+
+def _sin(x):
+    return math.sin(math.radians(x))
+
+
+def _cos(x):
+    return math.cos(math.radians(x))
+
+
+def _tan(x):
+    angle = math.radians(x)
+    if abs(math.cos(angle)) < 1e-10:
+        raise CalculationError("Tangent undefined at this angle")
+    return math.tan(angle)
+
+
+def _log(x):
+    if x <= 0:
+        raise CalculationError("Cannot find log of zero or negative number")
+    return math.log10(x)
+
+
+def _ln(x):
+    if x <= 0:
+        raise CalculationError("Cannot find ln of zero or negative number")
+    return math.log(x)
+
+
+def factorial(x):
+    """Factorial of int(x), with the calculator's domain checks."""
+    try:
+        num = int(x)
+    except (ValueError, OverflowError):
+        raise CalculationError("Invalid Input") from None
+    if num < 0:
+        raise CalculationError("Negative number")
+    if num > MAX_FACTORIAL:
+        raise CalculationError("Number too large")
+    # log2(n!) = lgamma(n + 1) / ln 2
+    if num > 1 and math.lgamma(num + 1) / _LN_2 > MAX_RESULT_BITS:
+        raise CalculationError("Result too large")
+    return timing.run_stage('factorial', big_factorial, num)
+
+
+def multiply(a, b):
+    """a * b, refusing integer products of more than MAX_RESULT_BITS."""
+    if type(a) is int and type(b) is int and a.bit_length() + b.bit_length() > MAX_RESULT_BITS:
+        raise CalculationError("Result too large")
+    return a * b
+
+
+def power(base, exponent):
+    """base ** exponent, refusing integer results of more than MAX_POWER_BITS."""
+    if type(base) is int and type(exponent) is int and exponent > 1 and abs(base) > 1:
+        if exponent * math.log2(abs(base)) > MAX_POWER_BITS:
+            raise CalculationError("Result too large")
+    result = base ** exponent
+    if isinstance(result, complex):
+        raise CalculationError("Result is not a real number")
+    return result
+
+
+FUNCTIONS = {
+    'sin': _sin,
+    'cos': _cos,
+    'tan': _tan,
+    'log': _log,
+    'ln': _ln,
+    '√': _sqrt,
+    '∛': _cbrt,
+    'x²': lambda x: power(x, 2),
+    'x³': lambda x: power(x, 3),
+    '!': factorial,
+}
+
+
+def _divide(a, b):
+    if b == 0:
+        raise CalculationError("Division by zero")
+    return a / b
+
+
+_BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': multiply,
+    '/': _divide,
+}
+
+
+def _compile_number(node):
+    value = node.value
+    return lambda: value
+
+
+def _compile_negate(node):
+    operand = compile_tree(node.operand)
+    return lambda: -operand()
+
+
+def _compile_percent(node):
+    operand = compile_tree(node.operand)
+    return lambda: operand() / 100
+
+
+def _compile_chain(node):
+    first = compile_tree(node.first)
+    rest = [(_BINARY_OPERATORS[op], compile_tree(operand)) for op, operand in node.rest]
+
+    def run():
+        result = first()
+        for op, operand in rest:
+            result = op(result, operand())
+        return result
+    return run
+
+
+def _compile_power(node):
+    base = compile_tree(node.base)
+    exponent = compile_tree(node.exponent)
+
+    return lambda: power(base(), exponent())
+
+
+def _compile_call(node):
+    # Directly nested calls such as sin(cos(√(x))) become one closure that
+    # applies the functions innermost first, rather than one closure per level
+    functions = []
+    while type(node) is Call:
+        functions.append(FUNCTIONS[node.name])
+        node = node.argument
+    argument = compile_tree(node)
+    if len(functions) == 1:
+        function = functions[0]
+        return lambda: function(argument())
+    functions.reverse()
+
+    def run():
+        value = argument()
+        for function in functions:
+            value = function(value)
+        return value
+    return run
+
+
+_COMPILERS = {
+    Number: _compile_number,
+    Negate: _compile_negate,
+    Percent: _compile_percent,
+    Chain: _compile_chain,
+    Power: _compile_power,
+    Call: _compile_call,
+}
+
+
+def compile_tree(node):
+    """Compile a syntax tree into a tree of closures.
+
+    The returned zero-argument callable computes the raw result; pass it to
+    run_compiled() to get the checked result.
+    """
+    return _COMPILERS[type(node)](node)
+
+
+def call_checked(function, *args):
+    """Call function, translating arithmetic exceptions into CalculationError."""
+    try:
+        return function(*args)
+    except ZeroDivisionError:
+        raise CalculationError("Division by zero") from None
+    except OverflowError:
+        raise CalculationError("Number too large") from None
+    except RecursionError:
+        raise CalculationError("Expression too deeply nested") from None
+    except (TypeError, ValueError) as e:
+        raise CalculationError(str(e)) from None
+
+
+def check_result(result):
+    """Reject NaN and infinite final results."""
+    if isinstance(result, float):
+        if math.isnan(result):
+            raise CalculationError("Not a number")
+        if math.isinf(result):
+            raise CalculationError("Infinite result")
+    return result
+
+
+def run_compiled(compiled):
+    """Run a callable from compile_tree() and return an int or float.
+
+    Raises CalculationError with a user-facing message on any failure.
+    """
+    return check_result(call_checked(compiled))
+
+
+def evaluate(node):
+    """Evaluate a syntax tree and return an int or float.
+
+    Raises CalculationError with a user-facing message on any failure.
+    """
+    try:
+        compiled = compile_tree(node)
+    except RecursionError:
+        raise CalculationError("Expression too deeply nested") from None
+    return run_compiled(compiled)
@@ -0,0 +1,139 @@
+"""
+Result formatting for the calculator display.
+
+Converting a multi-million-digit int to decimal takes longer than computing
+it, so huge ints are shown as a leading-digits summary such as
+``1.234567890…e+5565708``. The summary is derived from the top bits of the
+number and its bit length, which costs microseconds at any size. Full
+digits are only produced when asked for explicitly, by a divide-and-conquer
+conversion (or gmpy2's, when it is installed).
+"""
+
+import decimal
+import math
+
+from .bigfact import load_gmpy2
+
+# Ints with more digits than this are summarized; str() also refuses to
+# convert ints past its default 4300 digit limit
+MAX_DISPLAY_DIGITS = 4000
+_MAX_DISPLAY_BITS = int(MAX_DISPLAY_DIGITS * math.log2(10))
+
+# Significant digits shown in a summary
+SUMMARY_DIGITS = 10
+
+# Bits of the int kept when estimating its logarithm; far more than
+# SUMMARY_DIGITS needs, so only exact boundary cases need more work
+_SUMMARY_BITS = 192
+_SUMMARY_CONTEXT = decimal.Context(prec=80)
+_LOG10_2 = _SUMMARY_CONTEXT.log10(decimal.Decimal(2))
+
+# Pieces of at most this many bits are converted to Decimal directly
+_SPLIT_BITS = 128
+
+
+def format_result(result, full=False):
+    """Format a numeric result for display.
+
+    Huge ints are summarized unless ``full`` is true.
+    """
+    if isinstance(result, float):
+        # If the result is very small or very large, use scientific notation
+        if result != 0 and (abs(result) < 0.0001 or abs(result) > 10000000):
+            return f"{result:.10e}"
+        # Remove trailing zeros efficiently
+        formatted_result = f"{result:.10f}".rstrip('0').rstrip('.')
+        if formatted_result in ('', '-0'):
+            return "0"
+        return formatted_result
+    if full:
+        return full_digits(result)
+    if result.bit_length() > _MAX_DISPLAY_BITS:
+        return summarize_int(result)
+    return str(result)
+
+
+def is_summary(display):
+    """Whether a display string is a summary with digits left out."""
+    return '…' in display
+
+
+def full_digits(value):
+    """Return every decimal digit of an int, however long."""
+    if value.bit_length() <= _MAX_DISPLAY_BITS:
+        return str(value)
+    gmpy2 = load_gmpy2()
+    if gmpy2 is not None:
+        return gmpy2.mpz(value).digits()
+    return str(_to_decimal(value))
+
+
+def _to_decimal(value):
+    """Convert an int to an exact Decimal in subquadratic time.
+
+    Decimal(value) and str(value) take time quadratic in the number of
+    digits. Here the int is split in halves by bits, recursively, and the
+    halves are put back together as value = low + high * 2**w in Decimal
+    arithmetic, whose multiplication of long operands is subquadratic.
+    Each power 2**w is computed once and cached. This is the scheme of
+    CPython 3.12's _pylong.int_to_decimal_string.
+    """
+    powers = {}
+
+    def power_of_two(w):
+        result = powers.get(w)
+        if result is None:
+            if w <= _SPLIT_BITS:
+                result = decimal.Decimal(2) ** w
+            elif w - 1 in powers:
+                result = powers[w - 1] * 2
+            else:
+                half = w >> 1
+                result = power_of_two(half) * power_of_two(w - half)
+            powers[w] = result
+        return result
+
+    def convert(n, w):
+        if w <= _SPLIT_BITS:
+            return decimal.Decimal(n)
+        half = w >> 1
+        high = n >> half
+        low = n - (high << half)
+        return convert(low, half) + convert(high, w - half) * power_of_two(half)
+
+    with decimal.localcontext() as ctx:
+        # Exact arithmetic: enough precision for any int, and fail loudly otherwise
+        ctx.prec = decimal.MAX_PREC
+        ctx.Emax = decimal.MAX_EMAX
+        ctx.Emin = decimal.MIN_EMIN
+        ctx.traps[decimal.Inexact] = True
+        result = convert(abs(value), value.bit_length())
+        return -result if value < 0 else result
+
+
+def summarize_int(value, digits=SUMMARY_DIGITS):
+    """Return the leading digits and decimal exponent of an int, e.g. ``1.234…e+5565708``.
+
+    The digits are truncated, not rounded, so they are always a true prefix
+    of the full decimal representation.
+    """
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    shift = max(0, value.bit_length() - _SUMMARY_BITS)
+    top = value >> shift
+
+    # top << shift <= value < (top + 1) << shift bounds log10(value)
+    ctx = _SUMMARY_CONTEXT
+    shift_log = ctx.multiply(_LOG10_2, shift)
+    low = ctx.add(ctx.log10(decimal.Decimal(top)), shift_log)
+    high = ctx.add(ctx.log10(decimal.Decimal(top + 1)), shift_log) if shift else low
+    exponent = int(low.to_integral_value(decimal.ROUND_FLOOR))
+    if int(high.to_integral_value(decimal.ROUND_FLOOR)) != exponent and value >= 10 ** (exponent + 1):
+        # The bounds straddle a power of ten; settled with one exact comparison
+        exponent += 1
+        low = high
+
+    mantissa = ctx.power(10, ctx.subtract(low, exponent))
+    quantum = decimal.Decimal(1).scaleb(1 - digits)
+    mantissa = min(mantissa, 10 - quantum).quantize(quantum, rounding=decimal.ROUND_DOWN, context=ctx)
+    return f"{sign}{mantissa}…e+{exponent}"
@@ -0,0 +1,191 @@
+"""
+Bounded calculation history with prefix and substring search.
+
+A History keeps the last ``capacity`` calculations in a ring buffer made
+of two parallel lists, one of expressions and one of results. The strings
+are interned, so a calculation repeated in many sessions of one server
+process is stored once, and an entry costs two list slots.
+
+Searches use two indexes over the distinct expressions: a sorted list for
+prefix search with bisect, and a map from every three-character substring
+(trigram) to the expressions containing it for substring search. They are
+built on the first search and kept up to date after that, so sessions that
+never search do not pay for them.
+"""
+
+import sys
+from bisect import bisect_left, insort
+from collections import defaultdict
+from heapq import nlargest
+from itertools import chain
+
+# Sorts after any character an expression can contain, to bound a prefix range
+_MAX_CHAR = chr(sys.maxunicode)
+
+# A search matching more than 1/_SCAN_FRACTION of the distinct expressions
+# walks back through the entries instead of merging their entry numbers
+_SCAN_FRACTION = 8
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class HistoryEntry:
+    """One calculation: the expression and the display string it gave."""
+
+    __slots__ = ('expression', 'result')
+
+    def __init__(self, expression, result):
+        self.expression = expression
+        self.result = result
+
+    def __eq__(self, other):
+        return (isinstance(other, HistoryEntry)
+                and (self.expression, self.result) == (other.expression, other.result))
+
+    def __repr__(self):
+        return f"HistoryEntry({self.expression!r}, {self.result!r})"
+
+
+class History:
+    """The last ``capacity`` calculations, newest first, with search.
+
+    Not thread-safe; each session or window keeps its own.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        # Entry number n lives in slot n % capacity once the lists are full
+        self._expressions = []
+        self._results = []
+        self._added = 0
+        # Search indexes, None until the first search:
+        # expression -> its entry numbers, oldest first
+        self._numbers = None
+        # distinct expressions in sorted order
+        self._sorted = None
+        # trigram -> set of expressions containing it
+        self._trigrams = None
+
+    def __len__(self):
+        return len(self._expressions)
+
+    def __iter__(self):
+        return iter(self.recent())
+
+    def add(self, expression, result):
+        """Record a calculation, dropping the oldest one if full."""
+        expression = sys.intern(expression)
+        result = sys.intern(result)
+        number = self._added
+        self._added += 1
+        if len(self._expressions) < self.capacity:
+            self._expressions.append(expression)
+            self._results.append(result)
+        else:
+            slot = number % self.capacity
+            if self._numbers is not None:
+                self._forget(self._expressions[slot])
+            self._expressions[slot] = expression
+            self._results[slot] = result
+        if self._numbers is not None:
+            self._index(expression, number, insort)
+
+    def clear(self):
+        """Drop all entries and the search indexes."""
+        self._expressions = []
+        self._results = []
+        self._added = 0
+        self._numbers = self._sorted = self._trigrams = None
+
+    def _entry(self, number):
+        slot = number % self.capacity
+        return HistoryEntry(self._expressions[slot], self._results[slot])
+
+    def _newest(self, expressions, limit):
+        """Entries for any of the given distinct expressions, newest first."""
+        if limit is not None and len(expressions) * _SCAN_FRACTION > len(self._numbers):
+            # Many expressions match, so the newest entries will mostly match
+            # too: walking back from the newest finds `limit` of them quickly
+            return self._scan(expressions.__contains__, limit)
+        numbers = chain.from_iterable(self._numbers[expression] for expression in expressions)
+        numbers = sorted(numbers, reverse=True) if limit is None else nlargest(limit, numbers)
+        return [self._entry(number) for number in numbers]
+
+    def _scan(self, matches, limit):
+        found = []
+        for number in range(self._added - 1, self._added - 1 - len(self._expressions), -1):
+            if matches(self._expressions[number % self.capacity]):
+                found.append(self._entry(number))
+                if len(found) == limit:
+                    break
+        return found
+
+    def recent(self, limit=None):
+        """The most recent entries, newest first."""
+        count = len(self._expressions) if limit is None else min(limit, len(self._expressions))
+        return [self._entry(number) for number in range(self._added - 1, self._added - 1 - count, -1)]
+
+    def _index(self, expression, number, add_sorted):
+        numbers = self._numbers.get(expression)
+        if numbers is not None:
+            numbers.append(number)
+            return
+        self._numbers[expression] = [number]
+        add_sorted(self._sorted, expression)
+        trigrams = self._trigrams
+        for i in range(len(expression) - 2):
+            trigrams[expression[i:i + 3]].add(expression)
+
+    def _forget(self, expression):
+        # Entries leave in the order they came, so this is the oldest number
+        numbers = self._numbers[expression]
+        del numbers[0]
+        if numbers:
+            return
+        del self._numbers[expression]
+        del self._sorted[bisect_left(self._sorted, expression)]
+        for trigram in _trigrams(expression):
+            expressions = self._trigrams[trigram]
+            expressions.discard(expression)
+            if not expressions:
+                del self._trigrams[trigram]
+
+    def _build_indexes(self):
+        self._numbers = {}
+        self._sorted = []
+        self._trigrams = defaultdict(set)
+        for number in range(self._added - len(self._expressions), self._added):
+            self._index(self._expressions[number % self.capacity], number, list.append)
+        self._sorted.sort()
+
+    def search_prefix(self, prefix, limit=50):
+        """Entries whose expression starts with prefix, newest first."""
+        if self._numbers is None:
+            self._build_indexes()
+        start = bisect_left(self._sorted, prefix)
+        end = bisect_left(self._sorted, prefix + _MAX_CHAR, start)
+        return self._newest(set(self._sorted[start:end]), limit)
+
+    def search(self, text, limit=50):
+        """Entries whose expression contains text, newest first."""
+        if not text:
+            return self.recent(limit)
+        if len(text) < 3 and limit is not None:
+            # Too short for the trigram index, and likely to match most
+            # entries: the newest ones give `limit` matches soonest
+            return self._scan(lambda expression: text in expression, limit)
+        if self._numbers is None:
+            self._build_indexes()
+        if len(text) < 3:
+            candidates = self._numbers
+        else:
+            postings = [self._trigrams.get(trigram) for trigram in _trigrams(text)]
+            if None in postings:
+                return []
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        return self._newest({expression for expression in candidates if text in expression}, limit)
@@ -0,0 +1,343 @@
+"""
+Incremental evaluation for a live result preview while typing.
+
+IncrementalEvaluator consumes calculator keys one at a time and keeps
+shunting-yard parser state (an operand stack and an operator stack) between
+them. Each key does amortised constant work, and every intermediate state is
+kept as an immutable snapshot, so backspace just returns to the previous
+snapshot. The preview only has to fold whatever operators are still pending,
+instead of re-parsing the whole expression; that takes time proportional to
+the number of parentheses left open, and is done at most once per snapshot.
+
+Previews match calc_engine.engine.evaluate_expression() on the same text:
+syntax errors take precedence over domain errors, and input that is merely
+unfinished (``2+``, ``sin(``) has no preview yet. Neither has input that can
+build big integers (``**``, x², x³ or a factorial), whose result could take
+far longer than a keypress to compute.
+"""
+
+import re
+
+from .engine import evaluate_expression
+from .errors import CalculationError
+from .evaluator import FUNCTIONS, call_checked, check_result, multiply
+from .formatting import format_result
+
+_DIGITS = frozenset('0123456789.')
+_CONSTANTS = {'π': 3.141592653589793, 'e': 2.718281828459045}
+_BINARY = {
+    '+': (1, lambda a, b: a + b),
+    '-': (1, lambda a, b: a - b),
+    '*': (2, multiply),
+    '×': (2, multiply),
+    '/': (2, None),
+    '÷': (2, None),
+}
+_NEGATE_PRECEDENCE = 3
+
+# Values of _State.invalid: keys that can never parse; text the keypad
+# cannot produce or numbers too long to convert, which fall back to
+# evaluating the whole expression; and keys that may be costly to evaluate,
+# which end the preview
+_SYNTAX_ERROR = 1
+_UNKEYED = 2
+_COSTLY = 3
+
+# Keys that can build big integers, as sandbox.may_be_costly() sees them;
+# a second "*" straight after a first one makes a power as well
+_COSTLY_KEYS = frozenset({'!(', 'x²(', 'x³('})
+_COSTLY_MARKERS = ('!', '**', 'x²', 'x³')
+
+# _State.shown before the preview of a snapshot has been worked out
+_UNSET = object()
+
+# Splits typed text into keys; function names are keyed together with their "("
+_KEY_RE = re.compile(r"sin\(|cos\(|tan\(|log\(|ln\(|x²\(|x³\(|√\(|∛\(|!\(|[0-9.+\-×÷*/%()πe]")
+
+
+def _divide(a, b):
+    if b == 0:
+        raise CalculationError("Division by zero")
+    return a / b
+
+
+class _Failure:
+    """A domain or arithmetic error carried on the operand stack.
+
+    Errors only surface once the input is known to be syntactically valid,
+    as with the engine, which parses before it evaluates.
+    """
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        self.message = message
+
+
+def _apply(function, *args):
+    for arg in args:
+        if type(arg) is _Failure:
+            return arg
+    try:
+        return call_checked(function, *args)
+    except CalculationError as e:
+        return _Failure(str(e))
+
+
+def _number_value(text):
+    if '.' in text or 'e' in text:
+        return float(text)
+    try:
+        return int(text)
+    except ValueError:
+        # Longer than the interpreter's int/str conversion limit
+        raise CalculationError("Number too large") from None
+
+
+class _State:
+    """Immutable parser snapshot after one key.
+
+    ``values`` and ``ops`` are persistent stacks made of ``(item, rest)``
+    pairs, so a new snapshot shares everything below the top with the
+    previous one.
+    """
+    __slots__ = ('previous', 'key', 'values', 'ops', 'number', 'after_operand', 'invalid', 'length', 'shown')
+
+    def __init__(self, previous, key, values, ops, number, after_operand, invalid):
+        self.previous = previous
+        self.key = key
+        self.values = values
+        self.ops = ops
+        self.number = number
+        self.after_operand = after_operand
+        self.invalid = invalid
+        self.length = (previous.length if previous is not None else 0) + len(key)
+        self.shown = _UNSET
+
+
+def _reduce(values, ops, min_precedence):
+    """Apply pending operators of at least min_precedence; stops at parentheses."""
+    while ops is not None:
+        kind, precedence, function = ops[0]
+        if kind == 'open' or precedence < min_precedence:
+            break
+        ops = ops[1]
+        right, values = values
+        if kind == 'neg':
+            values = (_apply(lambda a: -a, right), values)
+        else:
+            left, values = values
+            values = (_apply(function, left, right), values)
+    return values, ops
+
+
+def _exponent_prefix(state):
+    """Find a number being continued with an exponent, as in ``3e-8``.
+
+    "3", "e", "-" first reads as 3·e minus something; a following digit
+    turns it into a single literal, as the engine's tokenizer does. Returns
+    the snapshot holding the pending number and the literal so far, or None.
+    """
+    sign = ''
+    if (state.key == '+' or state.key == '-') and state.previous is not None:
+        sign = state.key
+        state = state.previous
+    if state.key != 'e' or state.previous is None:
+        return None
+    base = state.previous
+    if base.invalid or not base.after_operand or not base.number or 'e' in base.number:
+        return None
+    return base, base.number + 'e' + sign
+
+
+def _flush_number(state):
+    """Push a number that is still being typed onto the value stack."""
+    if not state.number:
+        return state.values
+    return (_number_value(state.number), state.values)
+
+
+class IncrementalEvaluator:
+    """Evaluates calculator input key by key for a live preview."""
+
+    def __init__(self):
+        self.clear()
+
+    @property
+    def text(self):
+        """The expression typed so far."""
+        if self._text is None:
+            keys = []
+            state = self._state
+            while state.previous is not None:
+                keys.append(state.key)
+                state = state.previous
+            self._text = ''.join(reversed(keys))
+        return self._text
+
+    def clear(self):
+        self._state = _State(None, '', None, None, '', False, 0)
+        self._text = ''
+
+    def push(self, key):
+        """Add one key: a digit, '.', an operator, '%', a parenthesis, π, e,
+        or a function name such as 'sin' (which also opens its parenthesis).
+        """
+        if key in FUNCTIONS:
+            key += '('
+        self._state = self._next(self._state, key)
+        self._text = None
+
+    def backspace(self):
+        """Undo the last key by returning to the previous snapshot."""
+        if self._state.previous is not None:
+            self._state = self._state.previous
+            self._text = None
+
+    def set_text(self, text):
+        """Bring the evaluator in line with text typed elsewhere.
+
+        Rolls back to the longest common prefix and pushes only the new
+        keys, so edits at the end cost time proportional to the edit.
+        """
+        current = self.text
+        if text.startswith(current):
+            common = len(current)
+        else:
+            common = 0
+            for old_char, new_char in zip(current, text):
+                if old_char != new_char:
+                    break
+                common += 1
+        state = self._state
+        while state.length > common:
+            state = state.previous
+        pos = state.length
+        for match in _KEY_RE.finditer(text, pos):
+            if match.start() != pos:
+                break
+            state = self._next(state, match.group())
+            pos = match.end()
+        if pos != len(text):
+            # Text the keypad cannot produce, such as a bare "√4"
+            state = _State(state, text[pos:], None, None, '', False, _UNKEYED)
+        self._state = state
+        self._text = text
+
+    def _next(self, state, key):
+        if state.invalid:
+            return _State(state, key, None, None, '', False, state.invalid)
+        if key in _COSTLY_KEYS or (key == '*' and state.key == '*'):
+            return _State(state, key, None, None, '', False, _COSTLY)
+        values, ops = state.values, state.ops
+        number = state.number
+
+        if key in _DIGITS:
+            prefix = _exponent_prefix(state) if key != '.' else None
+            if prefix is not None:
+                base, literal = prefix
+                return _State(state, key, base.values, base.ops, literal + key, True, 0)
+            if number:
+                if key == '.' and ('.' in number or 'e' in number):
+                    return self._invalid(state, key)
+                number += key
+            elif state.after_operand:
+                # A digit straight after ")" or a constant
+                return self._invalid(state, key)
+            else:
+                number = key
+            return _State(state, key, values, ops, number, number != '.', False)
+
+        if number == '.':
+            return self._invalid(state, key)
+        try:
+            values = _flush_number(state)
+        except CalculationError:
+            return _State(state, key, None, None, '', False, _UNKEYED)
+        after_operand = state.after_operand
+
+        if key in _BINARY:
+            if not after_operand:
+                if key == '-':
+                    return _State(state, key, values, (('neg', _NEGATE_PRECEDENCE, None), ops), '', False, 0)
+                if key == '+':
+                    return _State(state, key, values, ops, '', False, 0)
+                return self._invalid(state, key)
+            precedence, function = _BINARY[key]
+            values, ops = _reduce(values, ops, precedence)
+            return _State(state, key, values, (('bin', precedence, function or _divide), ops), '', False, 0)
+
+        if key == '%':
+            if not after_operand:
+                return self._invalid(state, key)
+            top, rest = values
+            return _State(state, key, (_apply(lambda a: a / 100, top), rest), ops, '', True, 0)
+
+        if key == ')':
+            if not after_operand:
+                return self._invalid(state, key)
+            values, ops = _reduce(values, ops, 0)
+            if ops is None:
+                return self._invalid(state, key)
+            (_, _, function), ops = ops
+            if function is not None:
+                top, rest = values
+                values = (_apply(function, top), rest)
+            return _State(state, key, values, ops, '', True, 0)
+
+        # Keys that start an operand; after an operand they multiply implicitly
+        if after_operand:
+            values, ops = _reduce(values, ops, 2)
+            ops = (('bin', 2, _BINARY['*'][1]), ops)
+        if key in _CONSTANTS:
+            return _State(state, key, (_CONSTANTS[key], values), ops, '', True, 0)
+        if key == '(':
+            return _State(state, key, values, (('open', 0, None), ops), '', False, 0)
+        if key.endswith('(') and key[:-1] in FUNCTIONS:
+            return _State(state, key, values, (('open', 0, FUNCTIONS[key[:-1]]), ops), '', False, 0)
+        raise ValueError(f"Unknown key: {key!r}")
+
+    @staticmethod
+    def _invalid(state, key):
+        return _State(state, key, None, None, '', False, _SYNTAX_ERROR)
+
+    @property
+    def preview(self):
+        """Display string for the input so far, or None while it is unfinished."""
+        state = self._state
+        if state.shown is _UNSET:
+            state.shown = self._preview(state)
+        return state.shown
+
+    def _preview(self, state):
+        if state.previous is None:
+            return "0"
+        if state.invalid == _UNKEYED:
+            text = self.text
+            if any(marker in text for marker in _COSTLY_MARKERS):
+                return None
+            return evaluate_expression(text)
+        if state.invalid == _COSTLY:
+            return None
+        if state.invalid:
+            return "Error: Invalid syntax"
+        if not state.after_operand:
+            return None
+        try:
+            values = _flush_number(state)
+        except CalculationError:
+            return evaluate_expression(self.text)
+        values, ops = _reduce(values, state.ops, 0)
+        # Parentheses left open at the end are closed implicitly
+        while ops is not None:
+            (_, _, function), ops = ops
+            if function is not None:
+                top, rest = values
+                values = (_apply(function, top), rest)
+            values, ops = _reduce(values, ops, 0)
+        result = values[0]
+        if type(result) is _Failure:
+            return f"Error: {result.message}"
+        try:
+            return format_result(check_result(result))
+        except CalculationError as e:
+            return f"Error: {e}"
@@ -0,0 +1,256 @@
+"""
+Expression parser for the calculator engine.
+
+Turns calculator input such as ``√(16)+sin(30)×2`` into a small syntax tree
+in one left-to-right pass: a regex-driven tokenizer feeds a
+precedence-climbing parser, so the cost grows linearly with the input and
+nested parentheses are handled properly.
+"""
+
+import math
+import re
+
+from .errors import CalculationError
+
+# Token patterns, tried in order at each position of the input
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<func>sin|cos|tan|log|ln|√|∛|x²|x³|!)
+  | (?P<const>π|e)
+  | (?P<op>\*\*|[-+*/×÷%()])
+""", re.VERBOSE)
+
+_OPERATOR_ALIASES = {'×': '*', '÷': '/'}
+_CONSTANTS = {'π': math.pi, 'e': math.e}
+
+# Binding power of the binary operators; unary minus sits between
+# multiplication and exponentiation so that -2**2 == -4
+_BINARY_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '**': 4}
+_MULTIPLY_PRECEDENCE = 2
+_UNARY_PRECEDENCE = 3
+
+_END = ('end', None)
+_OPEN = ('op', '(')
+_CLOSE = ('op', ')')
+_PERCENT = ('op', '%')
+
+
+class Number:
+    """A literal number or constant."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Negate:
+    """Unary minus."""
+    __slots__ = ('operand',)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+
+class Percent:
+    """Postfix percent, i.e. the operand divided by 100."""
+    __slots__ = ('operand',)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+
+class Chain:
+    """A run of left-associative operators sharing one precedence level.
+
+    ``1+2-3+4`` is stored flat as ``first=1, rest=[('+', 2), ('-', 3), ('+', 4)]``
+    so long pasted sums never produce a deep tree.
+    """
+    __slots__ = ('precedence', 'first', 'rest')
+
+    def __init__(self, precedence, first, rest):
+        self.precedence = precedence
+        self.first = first
+        self.rest = rest
+
+
+class Power:
+    """Right-associative exponentiation."""
+    __slots__ = ('base', 'exponent')
+
+    def __init__(self, base, exponent):
+        self.base = base
+        self.exponent = exponent
+
+
+class Call:
+    """A calculator function such as ``sin``, ``√`` or ``!`` applied to an argument."""
+    __slots__ = ('name', 'argument')
+
+    def __init__(self, name, argument):
+        self.name = name
+        self.argument = argument
+
+
+def tokenize(source):
+    """Split an expression into ``(kind, value)`` tokens, ending with an end marker."""
+    tokens = []
+    append = tokens.append
+    match = _TOKEN_RE.match
+    pos = 0
+    end = len(source)
+    while pos < end:
+        m = match(source, pos)
+        if m is None:
+            raise CalculationError("Invalid syntax")
+        kind = m.lastgroup
+        text = m.group()
+        pos = m.end()
+        if kind == 'number':
+            if '.' in text or 'e' in text or 'E' in text:
+                append((kind, float(text)))
+            else:
+                try:
+                    append((kind, int(text)))
+                except ValueError:
+                    # Longer than the interpreter's int/str conversion limit
+                    raise CalculationError("Number too large") from None
+        elif kind == 'op':
+            append((kind, _OPERATOR_ALIASES.get(text, text)))
+        elif kind == 'const':
+            append((kind, _CONSTANTS[text]))
+        elif kind == 'func':
+            append((kind, text))
+    append(_END)
+    return tokens
+
+
+def _starts_operand(token):
+    """Whether a token can follow an operand to form an implicit multiplication (2π, 3√(4), (1)(2))."""
+    kind = token[0]
+    return kind == 'const' or kind == 'func' or token == _OPEN
+
+
+class _Parser:
+    """Precedence-climbing parser over a token list."""
+    __slots__ = ('tokens', 'pos')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self):
+        node = self.expression(1)
+        if self.tokens[self.pos] != _END:
+            raise CalculationError("Invalid syntax")
+        return node
+
+    def expression(self, min_precedence, left=None):
+        if left is None:
+            left = self.unary()
+        chain = None
+        tokens = self.tokens
+        while True:
+            token = tokens[self.pos]
+            kind, op = token
+            if kind == 'op' and op in _BINARY_PRECEDENCE:
+                precedence = _BINARY_PRECEDENCE[op]
+                if precedence < min_precedence:
+                    break
+                self.pos += 1
+            elif _starts_operand(token) and _MULTIPLY_PRECEDENCE >= min_precedence:
+                op = '*'
+                precedence = _MULTIPLY_PRECEDENCE
+            else:
+                break
+
+            if op == '**':
+                left = Power(left, self.expression(precedence))
+                chain = None
+                continue
+
+            right = self.expression(precedence + 1)
+            if chain is not None and chain.precedence == precedence:
+                chain.rest.append((op, right))
+            else:
+                chain = left = Chain(precedence, left, [(op, right)])
+        return left
+
+    def unary(self):
+        token = self.tokens[self.pos]
+        if token == ('op', '-') or token == ('op', '+'):
+            self.pos += 1
+            operand = self.expression(_UNARY_PRECEDENCE)
+            return Negate(operand) if token[1] == '-' else operand
+        return self.postfix()
+
+    def postfix(self):
+        return self.percent_suffix(self.primary())
+
+    def percent_suffix(self, node):
+        while self.tokens[self.pos] == _PERCENT:
+            self.pos += 1
+            node = Percent(node)
+        return node
+
+    def call_chain(self):
+        """Parse nested calls such as ``sin(√(ln(x)+1))`` without recursing per level.
+
+        Called with the position on a function name. Each ``name(`` prefix is
+        pushed onto a stack; the innermost argument is parsed once, then the
+        stack is unwound, closing one call per level and continuing any
+        trailing operators in the enclosing argument (the ``+1`` above).
+        """
+        tokens = self.tokens
+        pending = []
+        while tokens[self.pos][0] == 'func' and tokens[self.pos + 1] == _OPEN:
+            pending.append(tokens[self.pos][1])
+            self.pos += 2
+        if not pending:
+            # Function applied to a bare operand, e.g. √4
+            name = tokens[self.pos][1]
+            self.pos += 1
+            return Call(name, self.primary())
+
+        node = self.expression(1)
+        while True:
+            closing = tokens[self.pos]
+            if closing == _CLOSE:
+                self.pos += 1
+            elif closing != _END:
+                raise CalculationError("Invalid syntax")
+            node = Call(pending.pop(), node)
+            if not pending:
+                return node
+            # The enclosing call's argument may go on, e.g. the +1 in √(ln(x)+1)
+            node = self.expression(1, self.percent_suffix(node))
+
+    def primary(self):
+        token = self.tokens[self.pos]
+        kind, value = token
+        if kind == 'func':
+            return self.call_chain()
+        self.pos += 1
+        if kind == 'number' or kind == 'const':
+            return Number(value)
+        if token == _OPEN:
+            node = self.expression(1)
+            closing = self.tokens[self.pos]
+            if closing == _CLOSE:
+                self.pos += 1
+            elif closing != _END:
+                # Unclosed parentheses at the end of the input are closed implicitly
+                raise CalculationError("Invalid syntax")
+            return node
+        raise CalculationError("Invalid syntax")
+
+
+def parse(source):
+    """Parse calculator input into a syntax tree.
+
+    Raises CalculationError("Invalid syntax") for malformed input.
+    """
+    try:
+        return _Parser(tokenize(source)).parse()
+    except RecursionError:
+        raise CalculationError("Expression too deeply nested") from None
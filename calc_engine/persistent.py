@@ -0,0 +1,268 @@
+"""
+Result cache kept in an SQLite database, shared across processes and restarts.
+
+Several server processes can open the same file: SQLite in WAL mode lets
+readers run alongside a writer, and writes wait for each other with a
+timeout. The total size of the stored keys and values is kept in the
+database by triggers, so every process sees the same figure; a write that
+takes it past ``max_bytes`` evicts the least recently used entries.
+
+The cache is best effort. If the database is locked for too long or cannot
+be written, a lookup is a miss and a store is skipped; calculations never
+fail because of it. A database that cannot be opened or set up at all
+leaves the cache disabled: empty, and storing nothing.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+# Bump when the layout changes; an older database is then emptied
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES ('bytes', 0);
+CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+    UPDATE totals SET value = value + new.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+    UPDATE totals SET value = value - old.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE OF size ON results BEGIN
+    UPDATE totals SET value = value + new.size - old.size WHERE name = 'bytes';
+END;
+"""
+
+# Entries removed per statement while evicting
+_EVICT_BATCH = 64
+
+
+def _encode_key(key):
+    return json.dumps(key, ensure_ascii=False)
+
+
+def _stored_bytes(connection):
+    return connection.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+
+
+class PersistentCache:
+    """Least-recently-used cache of string values in an SQLite file.
+
+    Keys are strings or tuples of strings, as used with LRUCache. The file
+    holds at most about ``max_bytes`` of keys and values; eviction brings it
+    down to 90% of that. How recently an entry was used is only written
+    back when it is at least ``touch_interval`` seconds out of date, so
+    lookups rarely need a write. ``timeout`` is how long to wait for
+    another process's write before giving up. ``enabled`` is False if the
+    database could not be opened or set up.
+    """
+
+    def __init__(self, path, max_bytes=64 << 20, touch_interval=60.0, timeout=1.0, clock=time.time):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.enabled = True
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._create()
+        except (sqlite3.Error, OSError):
+            self.errors += 1
+            self.enabled = False
+            self.close()
+
+    def _connection(self):
+        # sqlite3 connections belong to one thread, and must not be used in
+        # a child process after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _create(self):
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == _SCHEMA_VERSION:
+            return
+        # A new file gets the schema; one from an older layout is emptied first
+        drop = "DROP TABLE IF EXISTS results; DROP TABLE IF EXISTS totals;" if version else ""
+        connection.executescript(
+            f"BEGIN IMMEDIATE; {drop} {_SCHEMA} PRAGMA user_version = {_SCHEMA_VERSION}; COMMIT;")
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def __len__(self):
+        if not self.enabled:
+            return 0
+        try:
+            return self._connection().execute("SELECT count(*) FROM results").fetchone()[0]
+        except sqlite3.Error:
+            self._count('errors')
+            return 0
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        """Return the stored value for key, or default if absent."""
+        if not self.enabled:
+            if count:
+                self._count('misses')
+            return default
+        encoded = _encode_key(key)
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value, used FROM results WHERE key = ?", (encoded,)).fetchone()
+        except sqlite3.Error:
+            self._count('errors')
+            row = None
+        if row is not None:
+            now = self._clock()
+            if now - row[1] >= self.touch_interval:
+                # Only recency is lost if this fails; the value is still good
+                try:
+                    connection.execute("UPDATE results SET used = ? WHERE key = ?", (now, encoded))
+                except sqlite3.Error:
+                    self._count('errors')
+        if count:
+            self._count('misses' if row is None else 'hits')
+        return default if row is None else row[0]
+
+    def put(self, key, value):
+        """Store a string value, evicting least recently used entries if over size."""
+        if not self.enabled:
+            return
+        encoded = _encode_key(key)
+        size = len(encoded.encode('utf-8')) + len(value.encode('utf-8'))
+        if size > self.max_bytes // 10:
+            return  # Would push out a large part of the cache by itself
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT INTO results VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "value = excluded.value, size = excluded.size, used = excluded.used",
+                    (encoded, value, size, self._clock()),
+                )
+                evicted = self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        if evicted:
+            self._count('evictions', evicted)
+
+    def _evict(self, connection):
+        stored = _stored_bytes(connection)
+        if stored <= self.max_bytes:
+            return 0
+        target = self.max_bytes * 9 // 10
+        evicted = 0
+        while stored > target:
+            cursor = connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used LIMIT ?)",
+                (_EVICT_BATCH,))
+            if cursor.rowcount <= 0:
+                break
+            evicted += cursor.rowcount
+            stored = _stored_bytes(connection)
+        return evicted
+
+    def get_or_compute(self, key, compute):
+        """Return the stored value for key, calling compute() and storing its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def warm(self, cache, limit):
+        """Copy up to ``limit`` of the most recently used entries into another cache.
+
+        Entries are put least recent first, so an LRUCache ends up with the
+        same recency order. Returns the number of entries copied.
+        """
+        if not self.enabled:
+            return 0
+        try:
+            rows = self._connection().execute(
+                "SELECT key, value FROM results ORDER BY used DESC LIMIT ?", (limit,)).fetchall()
+        except sqlite3.Error:
+            self._count('errors')
+            return 0
+        for encoded, value in reversed(rows):
+            key = json.loads(encoded)
+            cache.put(tuple(key) if isinstance(key, list) else key, value)
+        return len(rows)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        if self.enabled:
+            self._connection().execute("DELETE FROM results")
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.errors = 0
+
+    def stats(self):
+        """Return a snapshot of the size and counters."""
+        size = stored = None
+        if self.enabled:
+            try:
+                connection = self._connection()
+                size = connection.execute("SELECT count(*) FROM results").fetchone()[0]
+                stored = _stored_bytes(connection)
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'size': size,
+                'bytes': stored,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        """Close this thread's connection to the database."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
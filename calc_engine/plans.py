@@ -0,0 +1,81 @@
+"""
+Compiled-expression plan cache.
+
+A plan is an expression that has already been parsed and compiled into a
+closure tree. Plans are kept in a bounded LRU keyed on the normalized
+source, so formulas that are evaluated over and over skip tokenizing,
+parsing and compiling entirely.
+"""
+
+from . import timing
+from .cache import LRUCache
+from .errors import CalculationError
+from .evaluator import compile_tree, run_compiled
+from .parser import parse
+
+
+def normalize(source):
+    """Normalize expression source for use as a cache key.
+
+    Only surrounding whitespace is dropped. Mapping × and ÷ onto * and /
+    would be unsafe: ``2××3`` is a syntax error but ``2**3`` is a power.
+    """
+    return source.strip()
+
+
+class Plan:
+    """A parsed and compiled expression, ready to evaluate."""
+    __slots__ = ('source', 'compiled')
+
+    def __init__(self, source, compiled):
+        self.source = source
+        self.compiled = compiled
+
+    def evaluate(self):
+        """Run the plan and return an int or float, raising CalculationError on failure."""
+        return run_compiled(self.compiled)
+
+
+class PlanCache:
+    """Thread-safe LRU cache of compiled plans with hit/miss counters."""
+
+    def __init__(self, maxsize=1024):
+        self._plans = LRUCache(capacity=maxsize)
+
+    @property
+    def maxsize(self):
+        return self._plans.capacity
+
+    def get(self, source):
+        """Return the plan for an expression, compiling it on a miss.
+
+        Raises CalculationError if the expression does not parse.
+        """
+        key = normalize(source)
+        plan = self._plans.get(key)
+        if plan is None:
+            try:
+                plan = timing.run_stage('parse', _build_plan, key)
+            except RecursionError:
+                raise CalculationError("Expression too deeply nested") from None
+            self._plans.put(key, plan)
+        return plan
+
+    def clear(self):
+        self._plans.clear()
+
+    def stats(self):
+        return self._plans.stats()
+
+
+def _build_plan(source):
+    return Plan(source, compile_tree(parse(source)))
+
+
+# Process-wide default cache used by the engine entry points
+plan_cache = PlanCache()
+
+
+def compile_expression(source):
+    """Return the cached plan for an expression from the process-wide cache."""
+    return plan_cache.get(source)
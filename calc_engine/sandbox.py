@@ -0,0 +1,231 @@
+"""
+Sandboxed evaluation in worker processes with a time and memory budget.
+
+The engine refuses results it can tell are too big up front, and big
+factorials stop at their CancelToken deadline, but some work cannot be
+interrupted from inside: a large integer power runs to the end once
+started. A Sandbox runs calculations that might be expensive in worker
+processes whose address space is capped with setrlimit. A worker that
+overruns its time budget is killed and replaced, so the calling process,
+such as a web server shared by many users, is never blocked by a runaway
+calculation. Short calculations that cannot grow big integers run
+in-process, as before.
+
+While stage timing is on in the calling process, workers time their calls
+too and send the records back with the results, so the active Profiler
+sees the costly calls as well.
+"""
+
+import os
+import queue
+import signal
+import threading
+import time
+
+from . import timing
+from .cancellation import CancelToken
+from .engine import calculate_factorial, evaluate_expression
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory is then not capped
+    resource = None
+
+# Operators that can build big integers; anything else is cheap to evaluate
+_COSTLY_MARKERS = ('!', '**', 'x²', 'x³')
+
+# Factorials of arguments below this take well under a millisecond
+_IN_PROCESS_FACTORIAL = 1000
+
+# Expressions up to this many characters parse and evaluate in a few
+# milliseconds; longer ones take about 5 microseconds per character
+_IN_PROCESS_LENGTH = 1000
+
+# Extra seconds a worker gets past its deadline to stop by itself
+_GRACE = 1.0
+
+# Seconds between checks of a caller's CancelToken while a worker runs
+_CANCEL_POLL = 0.05
+
+# Exit status of a worker that ran out of memory outside a calculation.
+# Allocators that cannot report failure, such as GMP's, abort instead.
+_OUT_OF_MEMORY_EXIT = 3
+_OUT_OF_MEMORY_EXITS = (_OUT_OF_MEMORY_EXIT, -signal.SIGABRT)
+
+
+def may_be_costly(expression):
+    """Whether an expression can take a long time: it can produce big
+    integers, or is long enough to be slow to parse.
+    """
+    return len(expression) > _IN_PROCESS_LENGTH or any(marker in expression for marker in _COSTLY_MARKERS)
+
+
+def factorial_may_be_costly(input_value):
+    """Whether the factorial of a display value can take a long time."""
+    try:
+        return abs(float(input_value)) >= _IN_PROCESS_FACTORIAL
+    except (TypeError, ValueError):
+        return False  # Rejected as invalid input without any work
+
+
+def _serve(connection, timeout, memory_limit):
+    """Worker process entry point."""
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    try:
+        _answer(connection, timeout)
+    except MemoryError:
+        # Such as while sending a huge result; the parent reads the status
+        os._exit(_OUT_OF_MEMORY_EXIT)
+
+
+def _answer(connection, timeout):
+    """Evaluate requests until the connection closes.
+
+    Replies are ``(result, record)``, where record is the call's CallTiming
+    if the request asked for timing and None otherwise.
+    """
+    profiler = timing.Profiler(keep=1)
+    while True:
+        try:
+            kind, argument, full, timed = connection.recv()
+        except (EOFError, OSError):
+            return
+        if timed:
+            profiler.clear()
+            timing.enable(profiler)
+        else:
+            timing.disable()
+        token = CancelToken(timeout=timeout)
+        try:
+            if kind == 'expr':
+                result = evaluate_expression(argument, token, full=full)
+            else:
+                result = calculate_factorial(argument, token, full=full)
+        except MemoryError:
+            result = "Error: Not enough memory"
+        connection.send((result, profiler.latest() if timed else None))
+
+
+class _Worker:
+    __slots__ = ('process', 'connection')
+
+    def __init__(self, context, timeout, memory_limit):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, timeout, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class Sandbox:
+    """Evaluates calculations in worker processes under a time and memory budget.
+
+    ``timeout`` is the time budget per calculation in seconds and
+    ``memory_limit`` the address space of each worker in bytes. At most
+    ``workers`` calculations run at once; further callers wait for a free
+    worker. Results are display strings, as from calc_engine.engine.
+    """
+
+    def __init__(self, timeout=10, memory_limit=1 << 30, workers=2):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # Imported here so that may_be_costly() and the package stay cheap to import
+        import multiprocessing
+
+        # Workers are started fresh rather than forked from a threaded server
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def evaluate_expression(self, expression, full=False, cancel_token=None):
+        """Like engine.evaluate_expression(), in a worker if it may be costly.
+
+        ``cancel_token`` replaces the time budget of a calculation run
+        in-process, and cancelling it also stops one running in a worker.
+        """
+        if not may_be_costly(expression):
+            return evaluate_expression(expression, cancel_token or CancelToken(timeout=self.timeout), full=full)
+        return self._run('expr', expression, full, cancel_token)
+
+    def calculate_factorial(self, input_value, full=False, cancel_token=None):
+        """Like engine.calculate_factorial(), in a worker unless the argument is small."""
+        if not factorial_may_be_costly(input_value):
+            return calculate_factorial(input_value, cancel_token or CancelToken(timeout=self.timeout), full=full)
+        return self._run('fact', input_value, full, cancel_token)
+
+    def _run(self, kind, argument, full, cancel_token=None):
+        with self._slots:
+            worker = self._take()
+            try:
+                profiler = timing.active_profiler()
+                worker.connection.send((kind, argument, full, profiler is not None))
+                failure = self._wait(worker, cancel_token)
+                if failure is not None:
+                    self._discard(worker)
+                    worker = None
+                    return failure
+                result, record = worker.connection.recv()
+                if record is not None and profiler is not None:
+                    profiler.add(record)
+                return result
+            except (EOFError, OSError):
+                failure = self._died(worker)
+                self._discard(worker)
+                worker = None
+                return failure
+            finally:
+                if worker is not None:
+                    self._idle.put(worker)
+
+    def _wait(self, worker, cancel_token):
+        """Wait for a worker's answer; returns an error string if it is given up on."""
+        deadline = time.monotonic() + self.timeout + _GRACE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "Error: Calculation timed out"
+            if cancel_token is None:
+                if worker.connection.poll(remaining):
+                    return None
+            elif worker.connection.poll(min(remaining, _CANCEL_POLL)):
+                return None
+            elif cancel_token.cancelled:
+                return "Error: Calculation cancelled"
+
+    def _died(self, worker):
+        """Error string for a worker that died, from how it exited."""
+        worker.process.join(_GRACE)
+        if self.memory_limit and resource is not None and worker.process.exitcode in _OUT_OF_MEMORY_EXITS:
+            return "Error: Not enough memory"
+        # Killed by a signal, or failed to start; nothing to do with the input
+        return "Error: Calculation failed"
+
+    def _take(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            worker = _Worker(self._context, self.timeout, self.memory_limit)
+            with self._lock:
+                self._workers.append(worker)
+            return worker
+
+    def _discard(self, worker):
+        with self._lock:
+            self._workers.remove(worker)
+        worker.kill()
+
+    def close(self):
+        """Stop all worker processes."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+        while not self._idle.empty():
+            self._idle.get_nowait()
@@ -0,0 +1,198 @@
+"""
+Optional per-stage timing of engine calls.
+
+Timing is off by default. While a Profiler is enabled, every
+evaluate_expression() and calculate_factorial() call produces a CallTiming
+record showing where its time went:
+
+    cache      plan cache lookup
+    parse      tokenizing, parsing and compiling, on a plan cache miss
+    evaluate   running the compiled plan, excluding factorials
+    factorial  building big factorials
+    format     turning the result into display text
+
+Stages are exclusive, so they add up to the call's total. Records are kept
+in a short ring of recent calls and folded into per-stage histograms. While
+timing is off, an engine call costs one extra function call, and plan
+compilation and factorials one context-variable read.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ('cache', 'parse', 'evaluate', 'factorial', 'format')
+
+_profiler = None
+_current_call = contextvars.ContextVar('calc_engine_call_timing', default=None)
+
+
+class CallTiming:
+    """Stage durations, in nanoseconds, of one engine call."""
+    __slots__ = ('kind', 'source', 'stages', 'total_ns', 'result', '_mark', '_nested')
+
+    def __init__(self, kind, source):
+        self.kind = kind
+        self.source = source
+        self.stages = {}
+        self.total_ns = 0
+        self.result = None
+        self._mark = time.perf_counter_ns()
+        self._nested = 0
+
+    def lap(self, stage):
+        """Charge the time since the previous lap to stage, less any nested stages."""
+        now = time.perf_counter_ns()
+        self._charge(stage, now - self._mark - self._nested)
+        self._mark = now
+        self._nested = 0
+
+    def add(self, stage, ns):
+        """Charge ns spent in a stage nested inside the current lap."""
+        self._charge(stage, ns)
+        self._nested += ns
+
+    def _charge(self, stage, ns):
+        self.stages[stage] = self.stages.get(stage, 0) + ns
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'source': self.source,
+            'result': self.result,
+            'total_us': self.total_ns / 1000,
+            'stages_us': {stage: ns / 1000 for stage, ns in self.stages.items()},
+        }
+
+
+class Histogram:
+    """Counts of durations in power-of-two microsecond buckets."""
+    __slots__ = ('counts', 'total_ns')
+
+    # Bucket i holds durations under 2**i microseconds; the last is open-ended
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total_ns = 0
+
+    def add(self, ns):
+        self.counts[min((ns // 1000).bit_length(), self.BUCKETS - 1)] += 1
+        self.total_ns += ns
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, fraction):
+        """Upper bound in microseconds of the bucket holding the given fraction of samples."""
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 2 ** index
+        return 0
+
+    def as_dict(self):
+        count = self.count
+        return {
+            'count': count,
+            'mean_us': self.total_ns / count / 1000 if count else 0.0,
+            'p50_us': self.percentile(0.5),
+            'p90_us': self.percentile(0.9),
+            'p99_us': self.percentile(0.99),
+            'buckets': {2 ** index: n for index, n in enumerate(self.counts) if n},
+        }
+
+
+class Profiler:
+    """Collects CallTiming records and per-stage histograms; thread-safe."""
+
+    def __init__(self, keep=100):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=keep)
+        self._histograms = {}
+
+    @contextmanager
+    def measure(self, kind, source):
+        """Time one engine call; the record is passed to the caller for laps."""
+        record = CallTiming(kind, source)
+        start = record._mark
+        reset = _current_call.set(record)
+        try:
+            yield record
+        finally:
+            _current_call.reset(reset)
+            record.total_ns = time.perf_counter_ns() - start
+            self.add(record)
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+            for stage, ns in record.stages.items():
+                self._histogram(stage).add(ns)
+            self._histogram('total').add(record.total_ns)
+
+    def latest(self):
+        """The most recent CallTiming record, or None."""
+        with self._lock:
+            return self._records[-1] if self._records else None
+
+    def observe(self, stage, ns):
+        """Add a duration measured outside the engine, such as a front end's result cache."""
+        with self._lock:
+            self._histogram(stage).add(ns)
+
+    def _histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = Histogram()
+        return histogram
+
+    def recent(self):
+        """The most recent call records, newest first, as dicts."""
+        with self._lock:
+            return [record.as_dict() for record in reversed(self._records)]
+
+    def summary(self):
+        """Histogram statistics per stage, plus 'total' for whole calls."""
+        with self._lock:
+            return {stage: histogram.as_dict() for stage, histogram in self._histograms.items()}
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._histograms.clear()
+
+
+def enable(profiler=None):
+    """Start timing engine calls into profiler, or a new Profiler; returns it."""
+    global _profiler
+    _profiler = profiler if profiler is not None else Profiler()
+    return _profiler
+
+
+def disable():
+    """Stop timing engine calls."""
+    global _profiler
+    _profiler = None
+
+
+def active_profiler():
+    """The Profiler engine calls are timed into, or None while timing is off."""
+    return _profiler
+
+
+def run_stage(stage, function, *args):
+    """Call function, charging its time to stage if the current call is being timed."""
+    record = _current_call.get()
+    if record is None:
+        return function(*args)
+    start = time.perf_counter_ns()
+    try:
+        return function(*args)
+    finally:
+        record.add(stage, time.perf_counter_ns() - start)
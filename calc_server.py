@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Calculator HTTP API
+-------------------
+Serves the calculation engine as JSON over HTTP, for programs that need
+results without going through a front end. Built on asyncio with no
+dependencies beyond the standard library:
+
+    python calc_server.py --port 8080
+
+    POST /evaluate   {"expression": "2+3×4"}        -> {"expression": "2+3×4", "result": "14", "error": false}
+    POST /factorial  {"value": "20"}                -> {"value": "20", "result": "2432902008176640000", "error": false}
+    POST /batch      {"expressions": ["1+1", "√(-1)"]}
+                     -> {"results": [{"expression": "1+1", "result": "2", "error": false}, ...]}
+    GET  /health     -> {"status": "ok", "pending": 0}
+
+Each POST body may also set "full": true to get every digit of a huge
+result instead of a summary. Calculation errors are results like any other
+("Error: ..." with "error": true); malformed requests get a 4xx status with
+a {"message": ...} body, and a 503 means the server is at capacity.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from calc_engine import CancelToken, Sandbox, engine
+from calc_engine.sandbox import factorial_may_be_costly, may_be_costly
+
+logger = logging.getLogger(__name__)
+
+# Same limits as the Streamlit app
+CALCULATION_TIMEOUT = 10
+CALCULATION_MEMORY_LIMIT = 1 << 30
+
+# Expensive calculations waiting for or running in a worker; beyond this
+# new ones are refused with 503 rather than queued without bound
+MAX_PENDING = 64
+
+MAX_BATCH = 1000
+MAX_BODY = 1 << 20
+MAX_HEADERS = 100
+
+# Seconds an idle keep-alive connection, or a slow client, is given
+REQUEST_TIMEOUT = 15
+
+# Cheap batch items, and their total length in characters, evaluated on
+# the event loop before letting other connections run; 4000 characters
+# take about 20 ms
+_BATCH_SLICE = 100
+_BATCH_SLICE_LENGTH = 4000
+
+Request = namedtuple('Request', 'method path body keep_alive')
+
+
+class RequestError(Exception):
+    """A request the server cannot handle, answered with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Busy(Exception):
+    """Raised when MAX_PENDING expensive calculations are already waiting."""
+
+
+def _result(key, value, result):
+    return {key: value, 'result': result, 'error': result.startswith("Error")}
+
+
+class CalculatorService:
+    """Answers calculation requests without holding up the event loop.
+
+    Short calculations that cannot build big integers take microseconds
+    and run directly on the event loop. The others go to a Sandbox worker
+    process, waited for from a thread pool, so the loop keeps serving other
+    requests meanwhile and a runaway calculation is stopped at its time or
+    memory budget.
+    """
+
+    def __init__(self, timeout=CALCULATION_TIMEOUT, memory_limit=CALCULATION_MEMORY_LIMIT,
+                 workers=2, max_pending=MAX_PENDING, max_batch=MAX_BATCH):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.pending = 0
+        self.sandbox = Sandbox(timeout=timeout, memory_limit=memory_limit, workers=workers)
+        # One thread per sandbox worker; further calculations queue here
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calc-server')
+
+    def _submit(self, function, *args):
+        """Run function in a worker thread, counted as pending until it is done."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        self.pending += 1
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        self.pending -= 1
+
+    async def _offload(self, function, *args):
+        if self.pending >= self.max_pending:
+            raise Busy()
+        return await self._submit(function, *args)
+
+    async def evaluate_expression(self, expression, full=False):
+        if not may_be_costly(expression):
+            return engine.evaluate_expression(expression, CancelToken(timeout=self.timeout), full=full)
+        return await self._offload(self.sandbox.evaluate_expression, expression, full)
+
+    async def calculate_factorial(self, value, full=False):
+        if not factorial_may_be_costly(value):
+            return engine.calculate_factorial(value, CancelToken(timeout=self.timeout), full=full)
+        return await self._offload(self.sandbox.calculate_factorial, value, full)
+
+    async def evaluate_batch(self, expressions, full=False):
+        """Results in input order.
+
+        Each distinct item that may be costly goes to the sandbox and counts
+        as one pending calculation; the batch is refused whole if they
+        would not all fit under max_pending. The rest are evaluated on the
+        event loop a slice at a time.
+        """
+        unique = dict.fromkeys(expressions)
+        costly = [expression for expression in unique if may_be_costly(expression)]
+        if len(costly) > self.max_pending:
+            raise RequestError(413, f"At most {self.max_pending} expressions that may be costly per batch")
+        if self.pending + len(costly) > self.max_pending:
+            raise Busy()
+        waiting = {expression: self._submit(self.sandbox.evaluate_expression, expression, full)
+                   for expression in costly}
+        results = {}
+        try:
+            count = length = 0
+            for expression in unique:
+                if expression in waiting:
+                    continue
+                if count >= _BATCH_SLICE or length >= _BATCH_SLICE_LENGTH:
+                    await asyncio.sleep(0)
+                    count = length = 0
+                results[expression] = engine.evaluate_expression(
+                    expression, CancelToken(timeout=self.timeout), full=full)
+                count += 1
+                length += len(expression)
+            for expression, future in waiting.items():
+                results[expression] = await future
+        except BaseException:
+            for future in waiting.values():
+                future.cancel()
+            raise
+        return [results[expression] for expression in expressions]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.sandbox.close()
+
+
+def _field(data, name, types, description):
+    value = data.get(name)
+    if not isinstance(value, types):
+        raise RequestError(400, f"'{name}' must be {description}")
+    return value
+
+
+def _full(data):
+    full = data.get('full', False)
+    if not isinstance(full, bool):
+        raise RequestError(400, "'full' must be true or false")
+    return full
+
+
+async def _evaluate(service, data):
+    expression = _field(data, 'expression', str, "a string")
+    return _result('expression', expression, await service.evaluate_expression(expression, _full(data)))
+
+
+async def _factorial(service, data):
+    value = _field(data, 'value', (str, int, float), "a number or a string")
+    if isinstance(value, bool):
+        raise RequestError(400, "'value' must be a number or a string")
+    return _result('value', value, await service.calculate_factorial(str(value), _full(data)))
+
+
+async def _batch(service, data):
+    expressions = _field(data, 'expressions', list, "a list of strings")
+    if not all(isinstance(expression, str) for expression in expressions):
+        raise RequestError(400, "'expressions' must be a list of strings")
+    if len(expressions) > service.max_batch:
+        raise RequestError(413, f"At most {service.max_batch} expressions per batch")
+    results = await service.evaluate_batch(expressions, _full(data))
+    return {'results': [_result('expression', expression, result)
+                        for expression, result in zip(expressions, results)]}
+
+
+ROUTES = {
+    'evaluate': _evaluate,
+    'factorial': _factorial,
+    'batch': _batch,
+}
+
+
+async def call(service, name, data):
+    """Run endpoint ``name`` on a decoded JSON body; returns (status, payload)."""
+    handler = ROUTES.get(name)
+    if handler is None:
+        return 404, {'message': f"No such endpoint: {name}"}
+    if not isinstance(data, dict):
+        return 400, {'message': "Body must be a JSON object"}
+    try:
+        return 200, await handler(service, data)
+    except RequestError as e:
+        return e.status, {'message': str(e)}
+    except Busy:
+        return 503, {'message': "Server busy, retry later"}
+    except Exception:
+        logger.exception("Request to %s failed", name)
+        return 500, {'message': "Internal error"}
+
+
+async def respond(service, request):
+    """Return (status, payload, extra headers) for a parsed request."""
+    if request.path == '/health':
+        if request.method != 'GET':
+            return 405, {'message': "Use GET"}, [('Allow', 'GET')]
+        return 200, {'status': 'ok', 'pending': service.pending}, []
+    name = request.path[1:]
+    if name not in ROUTES:
+        return 404, {'message': f"No such endpoint: {request.path}"}, []
+    if request.method != 'POST':
+        return 405, {'message': "Use POST"}, [('Allow', 'POST')]
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return 400, {'message': "Body must be JSON"}, []
+    status, payload = await call(service, name, data)
+    return status, payload, [('Retry-After', '1')] if status == 503 else []
+
+
+async def read_request(reader):
+    """Read one HTTP/1.x request, or return None if the client hung up."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise RequestError(431, "Too many headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'transfer-encoding' in headers:
+        raise RequestError(501, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, "Bad Content-Length") from None
+    if not 0 <= length <= MAX_BODY:
+        raise RequestError(413, f"Body larger than {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b''
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return Request(method, target.split('?', 1)[0], body, keep_alive)
+
+
+def write_response(writer, status, payload, keep_alive, extra_headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        "Connection: keep-alive" if keep_alive else "Connection: close",
+    ]
+    head.extend(f"{name}: {value}" for name, value in extra_headers)
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+
+async def handle_connection(service, reader, writer):
+    """Serve requests on one connection until it closes or misbehaves."""
+    try:
+        while True:
+            try:
+                request = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+            except RequestError as e:
+                write_response(writer, e.status, {'message': str(e)}, keep_alive=False)
+                await writer.drain()
+                break
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                # Idle, truncated, or a line longer than the stream limit
+                break
+            if request is None:
+                break
+            status, payload, extra_headers = await respond(service, request)
+            write_response(writer, status, payload, request.keep_alive, extra_headers)
+            await writer.drain()
+            if not request.keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8080):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    address = server.sockets[0].getsockname()
+    # Flushed so a parent process (e.g. the load test) can read the port
+    print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the calculator engine as a JSON HTTP API.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on; 0 picks a free one (default: 8080)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="worker processes for expensive calculations (default: 2)")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help=f"expensive calculations queued before answering 503 (default: {MAX_PENDING})")
+    parser.add_argument('--timeout', type=float, default=CALCULATION_TIMEOUT,
+                        help=f"seconds allowed per calculation (default: {CALCULATION_TIMEOUT})")
+    parser.add_argument('--memory-limit', type=int, default=CALCULATION_MEMORY_LIMIT >> 20,
+                        help=f"MiB of memory per worker process (default: {CALCULATION_MEMORY_LIMIT >> 20})")
+    options = parser.parse_args(argv)
+    if options.workers < 1 or options.max_pending < 1:
+        parser.error("--workers and --max-pending must be at least 1")
+
+    service = CalculatorService(timeout=options.timeout, memory_limit=options.memory_limit << 20,
+                                workers=options.workers, max_pending=options.max_pending)
+    try:
+        asyncio.run(serve(service, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Client-side keypad for the Streamlit calculator.
+
+Keys are collected in the browser and sent to the server in batches: at
+once for "=", "C" and the function keys, otherwise when typing pauses for
+DEBOUNCE_MS. Until a batch is answered the browser echoes the pending keys
+on the display, so typing a number costs one rerun instead of one per
+digit.
+
+Streamlit only keeps the newest component value when reruns are coalesced,
+so a batch could be overwritten by the next one before the server saw it.
+Keys are therefore numbered, the server passes back how many it has
+applied, and every batch repeats the keys not yet acknowledged; a batch
+still unacknowledged after RESEND_MS is sent again.
+
+The frontend is plain HTML and JavaScript served from this package; there
+is no build step and nothing is loaded from a CDN.
+"""
+
+import os
+
+import streamlit.components.v1 as components
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("calculator_keypad", path=_FRONTEND_DIR)
+
+# Keys whose result depends on the server, so they are sent without waiting
+FLUSH_KEYS = ("=", "C", "sin", "cos", "tan", "log", "ln", "√", "x²", "x³", "∛", "!")
+
+# Pause in typing, in milliseconds, after which pending keys are sent
+DEBOUNCE_MS = 400
+
+# Time in milliseconds after which keys the server has not acknowledged are sent again
+RESEND_MS = 2000
+
+
+def keypad(rows, styles, display, expression, preview='', acknowledged=None, key=None, on_change=None):
+    """Render the display and keypad.
+
+    ``rows`` is a list of rows of ``(label, style)`` pairs, or strings for
+    section headings, and ``styles`` maps each style to ``(background, text
+    colour, font weight)``. Returns the newest batch of keys as
+    ``{'id': ..., 'mount': ..., 'start': n, 'keys': [...]}``, or None before
+    the first one: ``keys`` are the keys numbered ``start`` onwards by the
+    keypad identified by ``mount``, which numbers from 0 again when the page
+    is reloaded. Batches may repeat keys the caller has already applied.
+    ``acknowledged`` is ``(mount, count)`` for the count of that keypad's
+    keys the caller has applied, so it stops sending them.
+    """
+    return _component(
+        rows=rows,
+        styles=styles,
+        display=display,
+        expression=expression,
+        preview=preview,
+        flush_keys=list(FLUSH_KEYS),
+        debounce_ms=DEBOUNCE_MS,
+        resend_ms=RESEND_MS,
+        acknowledged=list(acknowledged) if acknowledged else None,
+        key=key,
+        on_change=on_change,
+        default=None,
+    )
@@ -0,0 +1,170 @@
+// Calculator keypad component. Speaks the Streamlit component protocol
+// directly over postMessage, so no component library has to be bundled.
+(function () {
+  "use strict";
+
+  var args = null;          // Latest render arguments from the server
+  var pending = [];         // Keys not yet sent
+  var unacked = [];         // Keys sent and not yet acknowledged by the server
+  var firstUnacked = 0;     // Sequence number of unacked[0]
+  var timer = null;
+  var resendTimer = null;
+  var batchCount = 0;
+  // Identifies this frame's key numbering, which starts again on a reload
+  var mountId = Date.now().toString(36) + Math.random().toString(36).slice(2, 8);
+
+  function send(type, data) {
+    var message = Object.assign({ isStreamlitMessage: true, type: type }, data);
+    window.parent.postMessage(message, "*");
+  }
+
+  function setFrameHeight() {
+    send("streamlit:setFrameHeight", { height: document.body.scrollHeight });
+  }
+
+  function flush() {
+    if (timer !== null) {
+      clearTimeout(timer);
+      timer = null;
+    }
+    if (pending.length === 0) {
+      return;
+    }
+    unacked = unacked.concat(pending);
+    pending = [];
+    sendUnacked();
+  }
+
+  // Streamlit keeps only the newest value if reruns are coalesced, so every
+  // batch carries all unacknowledged keys, and is repeated until acknowledged
+  function sendUnacked() {
+    if (resendTimer !== null) {
+      clearTimeout(resendTimer);
+      resendTimer = null;
+    }
+    if (unacked.length === 0) {
+      return;
+    }
+    batchCount += 1;
+    send("streamlit:setComponentValue", {
+      value: { id: mountId + "-" + batchCount, mount: mountId, start: firstUnacked, keys: unacked },
+      dataType: "json",
+    });
+    resendTimer = setTimeout(sendUnacked, args.resend_ms);
+  }
+
+  function acknowledge(acknowledged) {
+    if (acknowledged === null || acknowledged[0] !== mountId) {
+      return;
+    }
+    var done = acknowledged[1] - firstUnacked;
+    if (done <= 0) {
+      return;
+    }
+    unacked = unacked.slice(done);
+    firstUnacked += done;
+    if (unacked.length === 0 && resendTimer !== null) {
+      clearTimeout(resendTimer);
+      resendTimer = null;
+    }
+  }
+
+  // Mirror the server's handling of plain typing closely enough to show
+  // the keys before the server has seen them; the server's answer wins.
+  function echo(text, key) {
+    if (key === "⌫") {
+      return text.length > 1 ? text.slice(0, -1) : "0";
+    }
+    if (key === "()") {
+      var opened = (text.match(/\(/g) || []).length;
+      var closed = (text.match(/\)/g) || []).length;
+      key = opened > closed ? ")" : "(";
+    }
+    if (text === "0" && /^[0-9]$/.test(key)) {
+      return key;
+    }
+    return text + key;
+  }
+
+  function render() {
+    if (args === null) {
+      return;
+    }
+    var keys = unacked.concat(pending);
+    var display = args.display;
+    var expression = args.expression;
+    if (display.indexOf("Error") !== 0) {
+      for (var i = 0; i < keys.length; i++) {
+        // Whatever follows "=" or a function depends on the server's answer
+        if (args.flush_keys.indexOf(keys[i]) >= 0) {
+          break;
+        }
+        display = echo(display, keys[i]);
+        expression = echo(expression || "0", keys[i]);
+      }
+    }
+    document.getElementById("display").textContent = display;
+    document.getElementById("expression").textContent = expression;
+    document.getElementById("display").className = keys.length > 0 ? "pending" : "";
+    document.getElementById("preview").textContent = keys.length > 0 ? "" : args.preview;
+    setFrameHeight();
+  }
+
+  function press(key) {
+    pending.push(key);
+    if (args.flush_keys.indexOf(key) >= 0) {
+      flush();
+    } else {
+      if (timer !== null) {
+        clearTimeout(timer);
+      }
+      timer = setTimeout(flush, args.debounce_ms);
+    }
+    render();
+  }
+
+  function buildKeypad(rows, styles) {
+    var keypad = document.getElementById("keypad");
+    keypad.textContent = "";
+    rows.forEach(function (row) {
+      if (typeof row === "string") {
+        var label = document.createElement("div");
+        label.className = "section-label";
+        label.textContent = row;
+        keypad.appendChild(label);
+        return;
+      }
+      var div = document.createElement("div");
+      div.className = "keypad-row";
+      row.forEach(function (button) {
+        var style = styles[button[1]];
+        var element = document.createElement("button");
+        element.textContent = button[0];
+        element.style.backgroundColor = style[0];
+        element.style.color = style[1];
+        element.style.fontWeight = style[2];
+        element.addEventListener("click", function () {
+          press(button[0]);
+        });
+        div.appendChild(element);
+      });
+      keypad.appendChild(div);
+    });
+  }
+
+  window.addEventListener("message", function (event) {
+    if (event.data.type !== "streamlit:render") {
+      return;
+    }
+    var first = args === null;
+    args = event.data.args;
+    // Not every render follows a batch; only acknowledged keys are done
+    acknowledge(args.acknowledged);
+    if (first) {
+      buildKeypad(args.rows, args.styles);
+    }
+    render();
+  });
+
+  send("streamlit:componentReady", { apiVersion: 1 });
+})();
@@ -6,30 +6,255 @@ with older versions of macOS.
 
 import sys
 import math
-import re
+import time
+
+# Module load time, where --startup-profile starts counting
+_MODULE_STARTED = time.perf_counter()
 
 try:
     # Try to import PyQt5
     from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                                QGridLayout, QPushButton, QLineEdit, QLabel)
-    from PyQt5.QtCore import Qt
-    from PyQt5.QtGui import QFont
+                                QGridLayout, QPushButton, QLineEdit, QLabel,
+                                QCheckBox, QDockWidget, QListWidget, QListWidgetItem, QShortcut)
+    from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+    from PyQt5.QtGui import QKeySequence
 except ImportError:
+    if __name__ != "__main__":
+        # Imported by the launcher or a benchmark: let the caller fall back
+        raise
     print("PyQt5 is not installed. Please install it with: pip install PyQt5")
     print("Or run the terminal calculator with: ./macos_compat_calculator.py")
     sys.exit(1)
 
+# Upper bound in seconds for a single calculation such as a big factorial
+CALCULATION_TIMEOUT = 10
+
+# Live previews must never hold up a keypress
+PREVIEW_TIMEOUT = 0.05
+
+# Calculations that cannot build big integers run on the GUI thread for up
+# to this many seconds; one that takes longer, or any that might build big
+# integers, runs in a worker process so the window stays usable
+SYNC_BUDGET = 0.05
+
+# Address space of the worker process that runs expensive calculations
+CALCULATION_MEMORY_LIMIT = 1 << 30
+
+TIMED_OUT = "Error: Calculation timed out"
+
+# Calculations kept in the history, and how many matches its panel lists
+HISTORY_CAPACITY = 1000
+HISTORY_SHOWN = 200
+
+# Application-wide stylesheet. Qt parses it once, before any widget exists;
+# widgets pick their rules by object name or by their "role" property.
+STYLESHEET = """
+    QMainWindow {
+        background-color: #1C1C1E;
+        border-radius: 10px;
+    }
+    QWidget#displayFrame {
+        background-color: #282C34;
+        border: 2px solid #3C3C3E;
+        border-radius: 8px;
+    }
+    QLabel#expressionDisplay {
+        color: #8E8E93;
+        font: 16pt "Arial";
+    }
+    QLabel#previewDisplay {
+        color: #8E8E93;
+        font: 14pt "Arial";
+    }
+    QLineEdit#display {
+        background-color: transparent;
+        color: white;
+        border: none;
+        font: bold 42pt "Arial";
+    }
+    QPushButton {
+        color: white;
+        font: bold 14pt "Arial";
+        border-radius: 30px;
+        border: none;
+        min-height: 60px;
+        min-width: 70px;
+    }
+    QPushButton[role="number"] { background-color: #32373B; }
+    QPushButton[role="number"]:pressed { background-color: #454D54; }
+    QPushButton[role="operator"] { background-color: #FF9F0A; }
+    QPushButton[role="operator"]:pressed { background-color: #FFB143; }
+    QPushButton[role="function"] { background-color: #4E505F; font-weight: normal; }
+    QPushButton[role="function"]:pressed { background-color: #5E6171; }
+    QPushButton[role="parenthesis"] { background-color: #4E505F; }
+    QPushButton[role="parenthesis"]:pressed { background-color: #5E6171; }
+    QPushButton[role="clear"] { background-color: #A5A5A5; color: black; }
+    QPushButton[role="clear"]:pressed { background-color: #C6C6C6; }
+    QDockWidget {
+        color: white;
+    }
+    QLineEdit#historySearch {
+        background-color: #32373B;
+        color: white;
+        border: none;
+        border-radius: 6px;
+        padding: 4px;
+        font: 12pt "Arial";
+    }
+    QCheckBox#historyPrefix {
+        color: #8E8E93;
+    }
+    QListWidget#historyList {
+        background-color: #282C34;
+        color: white;
+        border: none;
+        font: 12pt "Arial";
+    }
+"""
+
+# Keypad layout: text, row, column, column span, style role
+KEYPAD = [
+    # Row 0: Clear and parentheses
+    ('C', 0, 0, 1, 'clear'), ('⌫', 0, 1, 1, 'clear'),
+    ('(', 0, 2, 1, 'parenthesis'), (')', 0, 3, 1, 'parenthesis'),
+    
+    # Row 1-3: Scientific functions
+    ('sin', 1, 0, 1, 'function'), ('cos', 1, 1, 1, 'function'),
+    ('tan', 1, 2, 1, 'function'), ('log', 1, 3, 1, 'function'),
+    ('ln', 2, 0, 1, 'function'), ('√', 2, 1, 1, 'function'),
+    ('x²', 2, 2, 1, 'function'), ('x³', 2, 3, 1, 'function'),
+    ('π', 3, 0, 1, 'function'), ('e', 3, 1, 1, 'function'),
+    ('!', 3, 2, 1, 'function'), ('∛', 3, 3, 1, 'function'),
+    
+    # Row 4-7: Number pad and operations (standard calculator layout)
+    ('7', 4, 0, 1, 'number'), ('8', 4, 1, 1, 'number'), ('9', 4, 2, 1, 'number'), ('÷', 4, 3, 1, 'operator'),
+    ('4', 5, 0, 1, 'number'), ('5', 5, 1, 1, 'number'), ('6', 5, 2, 1, 'number'), ('×', 5, 3, 1, 'operator'),
+    ('1', 6, 0, 1, 'number'), ('2', 6, 1, 1, 'number'), ('3', 6, 2, 1, 'number'), ('-', 6, 3, 1, 'operator'),
+    ('0', 7, 0, 1, 'number'), ('.', 7, 1, 1, 'number'), ('=', 7, 2, 1, 'operator'), ('+', 7, 3, 1, 'operator'),
+]
+
+# The engine is imported on first use rather than at startup, so the
+# window can paint first; see PyQtCalculator.paintEvent
+
+def may_be_costly(kind, argument, full=False):
+    """Whether a calculation might build big integers; kind is 'expr' or 'fact'."""
+    from calc_engine.sandbox import factorial_may_be_costly, may_be_costly
+    if kind == 'fact':
+        return factorial_may_be_costly(argument)
+    return full or may_be_costly(argument)
+
+def calculate(kind, argument, cancel_token, full=False):
+    """Run a calculation with the engine in this process."""
+    from calc_engine import engine
+    if kind == 'fact':
+        return engine.calculate_factorial(argument, cancel_token, full=full)
+    return engine.evaluate_expression(argument, cancel_token, full=full)
+
+_sandbox = None
+
+def get_sandbox():
+    """The worker process pool for expensive calculations, started on first use."""
+    global _sandbox
+    if _sandbox is None:
+        from calc_engine import Sandbox
+        # One calculation runs at a time, so one worker is enough
+        _sandbox = Sandbox(timeout=CALCULATION_TIMEOUT, memory_limit=CALCULATION_MEMORY_LIMIT, workers=1)
+    return _sandbox
+
+def quick_result(kind, argument, full=False):
+    """Result of a calculation that cannot build big integers and finishes
+    here within SYNC_BUDGET seconds, or None if it must go to the sandbox.
+    """
+    from calc_engine import CancelToken
+    if may_be_costly(kind, argument, full):
+        return None
+    result = calculate(kind, argument, CancelToken(timeout=SYNC_BUDGET), full)
+    return None if result == TIMED_OUT else result
+
+def evaluate_expression(expression, full=False):
+    """Evaluate an expression the way the window does, blocking until done.
+    
+    Needs no QApplication, so scripts and benchmarks.suite can use the
+    desktop evaluation path headless.
+    """
+    result = quick_result('expr', expression, full)
+    if result is None:
+        result = get_sandbox().evaluate_expression(expression, full)
+    return result
+
+def calculate_factorial(input_value, full=False):
+    """Calculate a factorial the way the window does, blocking until done."""
+    result = quick_result('fact', input_value, full)
+    if result is None:
+        result = get_sandbox().calculate_factorial(input_value, full)
+    return result
+
+def load_engine():
+    """Import the calculation engine ahead of the first keypress."""
+    import calc_engine  # noqa: F401
+
+class CalculationSignals(QObject):
+    # Job id and display string; delivered on the GUI thread
+    finished = pyqtSignal(int, str)
+
+class CalculationJob(QRunnable):
+    """Runs a calculation through the sandbox on the thread pool and signals the result.
+    
+    Ones that may build big integers, whose arithmetic holds the GIL until
+    it is done, run in the sandbox's worker process; the pool thread only
+    waits for them, so the GUI thread is never held up.
+    """
+    
+    def __init__(self, job_id, sandbox, kind, argument, full, cancel_token):
+        super().__init__()
+        self.job_id = job_id
+        self.sandbox = sandbox
+        self.kind = kind
+        self.argument = argument
+        self.full = full
+        self.cancel_token = cancel_token
+        self.signals = CalculationSignals()
+    
+    def run(self):
+        try:
+            if self.kind == 'fact':
+                result = self.sandbox.calculate_factorial(self.argument, self.full, self.cancel_token)
+            else:
+                result = self.sandbox.evaluate_expression(self.argument, self.full, self.cancel_token)
+        except Exception as e:
+            result = f"Error: {e}"
+        self.signals.finished.emit(self.job_id, result)
+
+class StartupProfile:
+    """Times the startup phases and prints them once the window has painted."""
+    
+    def __init__(self, started):
+        self.marks = [('start', started)]
+    
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+    
+    def report(self):
+        print("Startup profile (ms):")
+        previous = self.marks[0][1]
+        for phase, moment in self.marks[1:]:
+            print(f"  {phase:<14}{(moment - previous) * 1000:8.1f}")
+            previous = moment
+        print(f"  {'total':<14}{(previous - self.marks[0][1]) * 1000:8.1f}")
+
 class PyQtCalculator(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_profile=None):
         super().__init__()
+        self.startup_profile = startup_profile
+        self.painted = False
+        
+        # Calculation running on the thread pool, if any; its id tells a
+        # current result from one that was cancelled
+        self.job = None
+        self.job_finish = None
+        self.job_count = 0
         self.setWindowTitle("Python Calculator")
         self.setMinimumSize(400, 650)
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #1C1C1E;
-                border-radius: 10px;
-            }
-        """)
         
         # Main widget and layout
         self.central_widget = QWidget()
@@ -40,11 +265,8 @@ class PyQtCalculator(QMainWindow):
         
         # Create a display frame with a border
         self.display_frame = QWidget()
-        self.display_frame.setStyleSheet("""
-            background-color: #282C34;
-            border: 2px solid #3C3C3E;
-            border-radius: 8px;
-        """)
+        self.display_frame.setObjectName("displayFrame")
+        self.display_frame.setAttribute(Qt.WA_StyledBackground)
         self.display_frame.setMinimumHeight(160)
         
         # Layout for the display frame
@@ -54,27 +276,31 @@ class PyQtCalculator(QMainWindow):
         
         # Expression display (shows the full expression)
         self.expression_display = QLabel("")
+        self.expression_display.setObjectName("expressionDisplay")
         self.expression_display.setAlignment(Qt.AlignRight)
-        self.expression_display.setFont(QFont("Arial", 16))
-        self.expression_display.setStyleSheet("color: #8E8E93;")
         self.expression_display.setMinimumHeight(30)
         self.display_frame_layout.addWidget(self.expression_display)
         
         # Main display
         self.display = QLineEdit("0")
+        self.display.setObjectName("display")
         self.display.setReadOnly(True)
         self.display.setAlignment(Qt.AlignRight)
-        self.display.setFont(QFont("Arial", 42, QFont.Bold))
         self.display.setMinimumHeight(80)
-        self.display.setStyleSheet("""
-            QLineEdit {
-                background-color: transparent;
-                color: white;
-                border: none;
-            }
-        """)
+        # Huge results are summarized; the context menu can copy all digits
+        self.display.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.display.customContextMenuRequested.connect(self.show_display_menu)
         self.display_frame_layout.addWidget(self.display)
         
+        # Live preview of the result while typing
+        self.preview_display = QLabel("")
+        self.preview_display.setObjectName("previewDisplay")
+        self.preview_display.setAlignment(Qt.AlignRight)
+        self.display_frame_layout.addWidget(self.preview_display)
+        self.preview_evaluator = None  # Created with the first preview
+        self.history = None  # Created with the first calculation
+        self.history_dock = None  # Created when first shown
+        
         # Add the display frame to the main layout
         self.main_layout.addWidget(self.display_frame)
         
@@ -83,6 +309,7 @@ class PyQtCalculator(QMainWindow):
         
         # Current expression
         self.current_expression = ""
+        self.last_evaluated = ""
         self.function_mode = False
         self.function_name = ""
         self.bracket_count = 0
@@ -94,288 +321,189 @@ class PyQtCalculator(QMainWindow):
         
         # Define buttons
         self.create_buttons()
+        QShortcut(QKeySequence("Ctrl+H"), self, self.toggle_history)
         
         # Show the calculator
         self.show()
     
     def create_buttons(self):
-        # Button definitions: text, row, column, colspan
-        buttons = [
-            # Row 0: Clear and basic operations
-            ('C', 0, 0, 1), ('⌫', 0, 1, 1), ('(', 0, 2, 1), (')', 0, 3, 1),
-            
-            # Row 1-3: Scientific functions
-            ('sin', 1, 0, 1), ('cos', 1, 1, 1), ('tan', 1, 2, 1), ('log', 1, 3, 1),
-            ('ln', 2, 0, 1), ('√', 2, 1, 1), ('x²', 2, 2, 1), ('x³', 2, 3, 1),
-            ('π', 3, 0, 1), ('e', 3, 1, 1), ('!', 3, 2, 1), ('∛', 3, 3, 1),
-            
-            # Row 4-7: Number pad and operations (standard calculator layout)
-            ('7', 4, 0, 1), ('8', 4, 1, 1), ('9', 4, 2, 1), ('÷', 4, 3, 1),
-            ('4', 5, 0, 1), ('5', 5, 1, 1), ('6', 5, 2, 1), ('×', 5, 3, 1),
-            ('1', 6, 0, 1), ('2', 6, 1, 1), ('3', 6, 2, 1), ('-', 6, 3, 1),
-            ('0', 7, 0, 2), ('.', 7, 2, 1), ('=', 7, 3, 1), ('+', 7, 3, 1),
-        ]
-        
-        # Create and add buttons with specific styling
-        for btn_data in buttons:
-            if len(btn_data) == 4:
-                btn_text, row, col, colspan = btn_data
-                button = QPushButton(btn_text)
-                
-                # Different styling for different button types
-                if btn_text in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '.']:
-                    # Number buttons
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #32373B;
-                            color: white;
-                            font-weight: bold;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #454D54;
-                        }
-                    """)
-                elif btn_text in ['+', '-', '×', '÷']:
-                    # Operation buttons
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #FF9F0A;
-                            color: white;
-                            font-weight: bold;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #FFB143;
-                        }
-                    """)
-                elif btn_text == '=':
-                    # Equals button
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #FF9F0A;
-                            color: white;
-                            font-weight: bold;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #FFB143;
-                        }
-                    """)
-                elif btn_text in ['sin', 'cos', 'tan', 'log', 'ln', '√', 'x²', 'x³', 'π', 'e', '!', '∛']:
-                    # Scientific function buttons
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #4E505F;
-                            color: white;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #5E6171;
-                        }
-                    """)
-                elif btn_text in ['C', '⌫']:
-                    # Clear buttons
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #A5A5A5;
-                            color: black;
-                            font-weight: bold;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #C6C6C6;
-                        }
-                    """)
-                elif btn_text in ['(', ')']:
-                    # Parentheses
-                    button.setStyleSheet("""
-                        QPushButton {
-                            background-color: #4E505F;
-                            color: white;
-                            font-weight: bold;
-                            border-radius: 30px;
-                            border: none;
-                        }
-                        QPushButton:pressed {
-                            background-color: #5E6171;
-                        }
-                    """)
-                
-                button.setFont(QFont("Arial", 14))
-                button.setMinimumHeight(60)
-                
-                # Make buttons more square-shaped with padding
-                button.setMinimumWidth(70)
-                
-                # Connect button click
-                button.clicked.connect(lambda checked, text=btn_text: self.button_click(text))
-                
-                # Add to layout
-                if colspan > 1:
-                    self.buttons_layout.addWidget(button, row, col, 1, colspan)
-                else:
-                    self.buttons_layout.addWidget(button, row, col)
+        # Colours, fonts and sizes all come from the role's rules in STYLESHEET
+        self.buttons = {}
+        for text, row, column, span, role in KEYPAD:
+            button = QPushButton(text)
+            self.buttons[text] = button
+            button.setProperty("role", role)
+            button.clicked.connect(lambda checked, text=text: self.button_click(text))
+            self.buttons_layout.addWidget(button, row, column, 1, span)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            if self.startup_profile is not None:
+                self.startup_profile.mark("first paint")
+                self.startup_profile.report()
+            # The window is up; load the engine before the first keypress needs it
+            QTimer.singleShot(0, load_engine)
+    
+    def run_calculation(self, kind, argument, finish, full=False):
+        """Calculate and pass the display string to finish().
         
-        # Fix the '=' and '+' buttons that had the same position
-        equal_button = QPushButton('=')
-        equal_button.setStyleSheet("""
-            QPushButton {
-                background-color: #FF9F0A;
-                color: white;
-                font-weight: bold;
-                border-radius: 30px;
-                border: none;
-            }
-            QPushButton:pressed {
-                background-color: #FFB143;
-            }
-        """)
-        equal_button.setFont(QFont("Arial", 14))
-        equal_button.setMinimumHeight(60)
-        equal_button.setMinimumWidth(70)
-        equal_button.clicked.connect(lambda checked: self.button_click('='))
-        self.buttons_layout.addWidget(equal_button, 7, 3)
+        ``kind`` is 'expr' for an expression or 'fact' for a factorial. One
+        that cannot build big integers first runs here on the GUI thread
+        with a budget of SYNC_BUDGET seconds, so quick ones finish at once.
+        Anything else, or one that runs out of budget, is sent to a worker
+        process from the thread pool, and finish() is called when its
+        result arrives, unless it is cancelled first.
+        """
+        from calc_engine import CancelToken
+        result = quick_result(kind, argument, full)
+        if result is not None:
+            finish(result)
+            return
         
-        plus_button = QPushButton('+')
-        plus_button.setStyleSheet("""
-            QPushButton {
-                background-color: #FF9F0A;
-                color: white;
-                font-weight: bold;
-                border-radius: 30px;
-                border: none;
-            }
-            QPushButton:pressed {
-                background-color: #FFB143;
-            }
-        """)
-        plus_button.setFont(QFont("Arial", 14))
-        plus_button.setMinimumHeight(60)
-        plus_button.setMinimumWidth(70)
-        plus_button.clicked.connect(lambda checked: self.button_click('+'))
-        self.buttons_layout.addWidget(plus_button, 6, 3)  # Move + to row 6
+        self.job_count += 1
+        self.job = CalculationJob(self.job_count, get_sandbox(), kind, argument, full,
+                                  CancelToken(timeout=CALCULATION_TIMEOUT))
+        self.job_finish = finish
+        self.job.signals.finished.connect(self.calculation_finished)
+        QThreadPool.globalInstance().start(self.job)
+        self.set_busy(True)
     
-    def evaluate_expression(self, expression):
-        try:
-            # Handle empty expression
-            if not expression:
-                return '0'
-            
-            # Replace mathematical operators
-            expression = expression.replace('×', '*').replace('÷', '/')
-            
-            # Handle functions
-            expression = expression.replace('sin(', 'math.sin(math.radians(')
-            expression = expression.replace('cos(', 'math.cos(math.radians(')
-            expression = expression.replace('tan(', 'math.tan(math.radians(')
-            expression = expression.replace('log(', 'math.log10(')
-            expression = expression.replace('ln(', 'math.log(')
-            expression = expression.replace('√(', 'math.sqrt(')
-            
-            # Handle cube root similarly to other functions
-            # We need to catch all occurrences of ∛( and replace them with the right expression
-            cube_root_pattern = r'∛\((.*?)\)'
-            while re.search(cube_root_pattern, expression):
-                match = re.search(cube_root_pattern, expression)
-                if match:
-                    inner_expr = match.group(1)
-                    # Replace with inline calculation using ** (1/3)
-                    expression = expression.replace(f"∛({inner_expr})", f"({inner_expr})**(1/3)")
-            
-            # Handle our new function formats
-            expression = expression.replace('x²(', '(')
-            expression = expression.replace('x³(', '(')
-            expression = expression.replace('!(', '(')
-            
-            # Add closing parentheses if needed
-            open_count = expression.count('(')
-            close_count = expression.count(')')
-            if open_count > close_count:
-                expression += ')' * (open_count - close_count)
-            
-            # Process x², x³, !, operations after closing parentheses 
-            if self.function_name == 'x²':
-                try:
-                    value = eval(expression)
-                    return str(value ** 2)
-                except:
-                    return 'Error'
-            elif self.function_name == 'x³':
-                try:
-                    value = eval(expression)
-                    return str(value ** 3)
-                except:
-                    return 'Error'
-            elif self.function_name == '!':
-                try:
-                    value = eval(expression)
-                    # Use the new calculate_factorial method
-                    return self.calculate_factorial(str(value))
-                except:
-                    return 'Error'
-            
-            # Handle implicit multiplication with brackets
-            expression = expression.replace(')(', ')*(')
-            
-            # Handle percentage
-            if '%' in expression:
-                parts = expression.split('%')
-                if len(parts) == 2:
-                    try:
-                        value = float(parts[0])
-                        expression = str(value / 100)
-                    except:
-                        return 'Error'
-            
-            # Simple safety check
-            safe_expr = expression
-            for term in ['math.sin', 'math.cos', 'math.tan', 'math.log10', 
-                         'math.log', 'math.sqrt', 'math.radians', '**']:
-                safe_expr = safe_expr.replace(term, '')
-            
-            safe_chars = '0123456789.+-*/() '
-            for char in safe_expr:
-                if char not in safe_chars:
-                    return 'Error'
-            
-            # Evaluate the expression
-            result = eval(expression)
-            
-            # Handle division by zero and other errors
-            if isinstance(result, float) and (math.isinf(result) or math.isnan(result)):
-                return 'Error'
-            
-            # Format the result
-            if isinstance(result, float):
-                # Remove trailing zeros after decimal point
-                result = f"{result:g}"
-            
-            return str(result)
-        except:
-            return 'Error'
+    def calculation_finished(self, job_id, result):
+        if self.job is None or job_id != self.job.job_id:
+            return  # Cancelled while it was running
+        finish = self.job_finish
+        self.job = None
+        self.job_finish = None
+        self.set_busy(False)
+        finish(result)
+        self.update_preview()
+    
+    def cancel_calculation(self):
+        if self.job is not None:
+            self.job.cancel_token.cancel()
+            self.job = None
+            self.job_finish = None
+            self.set_busy(False)
+    
+    def set_busy(self, busy):
+        # While a calculation runs, C cancels it
+        self.buttons['C'].setText("Cancel" if busy else "C")
+        self.preview_display.setText("Calculating…" if busy else "")
+        if busy:
+            self.display_frame.setCursor(Qt.BusyCursor)
+        else:
+            self.display_frame.unsetCursor()
+    
+    def show_result(self, result, expression=None):
+        self.display.setText(result)
+        self.current_expression = result
+        if expression is not None:
+            self.record(expression, result)
+    
+    def record(self, expression, result):
+        from calc_engine import History
+        if self.history is None:
+            self.history = History(capacity=HISTORY_CAPACITY)
+        self.history.add(expression, result)
+        self.refresh_history()
+    
+    def toggle_history(self):
+        """Show or hide the history panel, building it the first time."""
+        if self.history_dock is None:
+            self.history_dock = QDockWidget("History", self)
+            panel = QWidget()
+            layout = QVBoxLayout(panel)
+            self.history_search = QLineEdit()
+            self.history_search.setObjectName("historySearch")
+            self.history_search.setPlaceholderText("Search history")
+            self.history_search.textChanged.connect(lambda text: self.refresh_history())
+            layout.addWidget(self.history_search)
+            self.history_prefix = QCheckBox("Starts with")
+            self.history_prefix.setObjectName("historyPrefix")
+            self.history_prefix.toggled.connect(lambda checked: self.refresh_history())
+            layout.addWidget(self.history_prefix)
+            self.history_list = QListWidget()
+            self.history_list.setObjectName("historyList")
+            # Double-click or Enter puts a past calculation back on the display
+            self.history_list.itemActivated.connect(self.recall)
+            layout.addWidget(self.history_list)
+            self.history_dock.setWidget(panel)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.history_dock)
+            self.history_dock.visibilityChanged.connect(lambda visible: self.refresh_history())
+        else:
+            self.history_dock.setVisible(not self.history_dock.isVisible())
+        if self.history_dock.isVisible():
+            self.refresh_history()
+            self.history_search.setFocus()
+    
+    def refresh_history(self):
+        if self.history_dock is None or not self.history_dock.isVisible():
+            return
+        self.history_list.clear()
+        if self.history is None:
+            return
+        query = self.history_search.text()
+        if query and self.history_prefix.isChecked():
+            entries = self.history.search_prefix(query, HISTORY_SHOWN)
+        else:
+            entries = self.history.search(query, HISTORY_SHOWN)
+        for entry in entries:
+            item = QListWidgetItem(f"{entry.expression} = {entry.result}")
+            item.setData(Qt.UserRole, (entry.expression, entry.result))
+            self.history_list.addItem(item)
+    
+    def recall(self, item):
+        if self.job is not None:
+            return  # Only C works while a calculation is running
+        expression, result = item.data(Qt.UserRole)
+        self.display.setText(result)
+        self.current_expression = result
+        self.expression_display.setText(f"{expression} =")
+        self.last_evaluated = expression
+        self.function_mode = False
+        self.function_name = ""
+        self.bracket_count = 0
+        self.update_preview()
+    
+    def show_display_menu(self, position):
+        from calc_engine import is_summary
+        menu = self.display.createStandardContextMenu()
+        if is_summary(self.display.text()):
+            menu.addSeparator()
+            menu.addAction("Copy All Digits", self.copy_all_digits)
+        menu.addSeparator()
+        menu.addAction("History\tCtrl+H", self.toggle_history)
+        menu.exec_(self.display.mapToGlobal(position))
+    
+    def copy_all_digits(self):
+        # Full conversion of a huge number is slow, so it only happens here
+        expression = self.last_evaluated
+        self.run_calculation('expr', expression, QApplication.clipboard().setText, full=True)
+    
+    def update_preview(self):
+        if self.job is not None:
+            return  # Showing the busy indicator
+        from calc_engine import CancelToken, IncrementalEvaluator
+        if self.preview_evaluator is None:
+            self.preview_evaluator = IncrementalEvaluator()
+        # The evaluator keeps its parser state, so only new keys are processed
+        with CancelToken(timeout=PREVIEW_TIMEOUT).activate():
+            self.preview_evaluator.set_text(self.current_expression)
+            preview = self.preview_evaluator.preview
+        if preview is None or preview.startswith('Error') or preview == self.display.text():
+            self.preview_display.setText("")
+        else:
+            self.preview_display.setText(f"= {preview}")
     
-    def calculate_factorial(self, input_value):
-        try:
-            # Convert input to integer
-            num = int(input_value)
-            
-            # Factorial is only defined for non-negative integers
-            if num < 0:
-                return "Error: Negative number"
-            
-            # Calculate factorial
-            return str(math.factorial(num))
-        
-        except ValueError:
-            return "Error: Invalid Input"
-
     def button_click(self, value):
+        if self.job is not None:
+            # Only C works while a calculation is running; it cancels it and clears
+            if value != 'C':
+                return
+            self.cancel_calculation()
+        
         current = self.display.text()
         
         # Clear error message if present when pressing any button except C
@@ -433,16 +561,14 @@ class PyQtCalculator(QMainWindow):
                     self.current_expression += ')'
                     self.bracket_count -= 1
                 # Handle function evaluation
-                result = self.evaluate_expression(self.current_expression)
-                self.display.setText(result)
-                self.current_expression = result
+                self.last_evaluated = expression = self.current_expression
                 self.function_mode = False
                 self.function_name = ""
+                self.run_calculation('expr', expression, lambda result: self.show_result(result, expression))
             else:
                 # Handle regular expression evaluation
-                result = self.evaluate_expression(self.current_expression)
-                self.display.setText(result)
-                self.current_expression = result
+                self.last_evaluated = expression = self.current_expression
+                self.run_calculation('expr', expression, lambda result: self.show_result(result, expression))
         elif value == 'x²':
             if current == '0' and self.current_expression == "":
                 # Don't calculate for initial zero, treat it as function entry
@@ -453,17 +579,16 @@ class PyQtCalculator(QMainWindow):
                 self.expression_display.setText(self.current_expression)
                 self.bracket_count += 1
             else:
-                try:
-                    # Get the current displayed number
-                    num = float(current)
-                    squared = num ** 2
-                    
+                def show_squared(squared):
+                    self.record(f"x²({current})", squared)
                     # Update the display and expression
-                    self.expression_display.setText(f"{current}² =")
-                    self.display.setText(str(squared))
-                    self.current_expression = str(squared)
-                except:
-                    self.display.setText('Error')
+                    self.display.setText(squared)
+                    if not squared.startswith('Error'):
+                        self.expression_display.setText(f"{current}² =")
+                        self.current_expression = squared
+                
+                self.last_evaluated = f"x²({current})"
+                self.run_calculation('expr', self.last_evaluated, show_squared)
         elif value == 'x³':
             if current == '0' and self.current_expression == "":
                 # Don't calculate for initial zero, treat it as function entry
@@ -474,17 +599,16 @@ class PyQtCalculator(QMainWindow):
                 self.expression_display.setText(self.current_expression)
                 self.bracket_count += 1
             else:
-                try:
-                    # Get the current displayed number
-                    num = float(current)
-                    cubed = num ** 3
-                    
+                def show_cubed(cubed):
+                    self.record(f"x³({current})", cubed)
                     # Update the display and expression
-                    self.expression_display.setText(f"{current}³ =")
-                    self.display.setText(str(cubed))
-                    self.current_expression = str(cubed)
-                except:
-                    self.display.setText('Error')
+                    self.display.setText(cubed)
+                    if not cubed.startswith('Error'):
+                        self.expression_display.setText(f"{current}³ =")
+                        self.current_expression = cubed
+                
+                self.last_evaluated = f"x³({current})"
+                self.run_calculation('expr', self.last_evaluated, show_cubed)
         elif value == 'π':
             self.display.setText(str(math.pi))
             self.current_expression = str(math.pi)
@@ -504,16 +628,20 @@ class PyQtCalculator(QMainWindow):
                 self.bracket_count += 1
             else:
                 # Calculate factorial using the new method
-                result = self.calculate_factorial(current)
+                self.last_evaluated = f"!({current})"
                 
-                # Update the display based on result
-                if result.startswith('Error'):
-                    self.display.setText(result)
-                else:
-                    # Update the display and expression
-                    self.expression_display.setText(f"{current}! =")
-                    self.display.setText(result)
-                    self.current_expression = result
+                def show_factorial(result):
+                    self.record(f"!({current})", result)
+                    # Update the display based on result
+                    if result.startswith('Error'):
+                        self.display.setText(result)
+                    else:
+                        # Update the display and expression
+                        self.expression_display.setText(f"{current}! =")
+                        self.display.setText(result)
+                        self.current_expression = result
+                
+                self.run_calculation('fact', current, show_factorial)
         elif value == '∛':
             if current == '0' and self.current_expression == "":
                 # Don't calculate for initial zero, treat it as function entry
@@ -524,17 +652,16 @@ class PyQtCalculator(QMainWindow):
                 self.expression_display.setText(self.current_expression)
                 self.bracket_count += 1
             else:
-                try:
-                    # Get the current displayed number and calculate cube root
-                    num = float(current)
-                    result = num ** (1/3)
-                    
+                def show_root(result):
+                    self.record(f"∛({current})", result)
                     # Update the display and expression
-                    self.expression_display.setText(f"∛{current} =")
-                    self.display.setText(str(result))
-                    self.current_expression = str(result)
-                except:
-                    self.display.setText('Error')
+                    self.display.setText(result)
+                    if not result.startswith('Error'):
+                        self.expression_display.setText(f"∛{current} =")
+                        self.current_expression = result
+                
+                self.last_evaluated = f"∛({current})"
+                self.run_calculation('expr', self.last_evaluated, show_root)
         elif value == '(':
             self.current_expression += '('
             self.display.setText(current + '(')
@@ -567,11 +694,27 @@ class PyQtCalculator(QMainWindow):
                     self.display.setText(current + value)
                     self.current_expression = self.current_expression + value
                     self.expression_display.setText(self.current_expression)
+        
+        self.update_preview()
 
 def main():
+    """Run the calculator window until it is closed; returns the exit status."""
+    # --startup-profile prints a timing breakdown up to the first paint
+    profile = StartupProfile(_MODULE_STARTED) if '--startup-profile' in sys.argv else None
+    if profile is not None:
+        profile.mark("imports")
     app = QApplication(sys.argv)
-    calculator = PyQtCalculator()
-    sys.exit(app.exec_())
+    # Set before any widget is created, so nothing has to be re-polished
+    app.setStyleSheet(STYLESHEET)
+    if profile is not None:
+        profile.mark("QApplication")
+    calculator = PyQtCalculator(profile)
+    if profile is not None:
+        profile.mark("window")
+    status = app.exec_()
+    if _sandbox is not None:
+        _sandbox.close()
+    return status
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
@@ -4,95 +4,228 @@ Python Calculator Runner
 ------------------------
 This script detects available dependencies and runs the appropriate version
 of the Python Calculator (either web-based with Streamlit or desktop with PyQt).
+
+With --batch it runs without a UI instead, evaluating expressions line by
+line from a file or stdin:
+
+    python run_calculator.py --batch formulas.txt --format csv --keep-going
 """
 
 import os
 import sys
-import subprocess
+import csv
+import json
+import time
+import argparse
+import itertools
 import importlib.util
 
+# Launcher start, for reporting how long it takes to hand over to a front end
+STARTED = time.perf_counter()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds each expression may take in batch mode, as in the front ends
+BATCH_TIMEOUT = 10
+
+# Dependency detection results are remembered here between runs
+DEPENDENCY_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'python_calculator', 'dependencies.json',
+)
+
+_detected = None
+
+def _environment_key():
+    """Identify this interpreter and its installed packages.
+
+    Installing or removing a package changes the modification time of its
+    site-packages directory, which invalidates the remembered results.
+    """
+    parts = [sys.executable, sys.version]
+    for entry in sys.path:
+        try:
+            parts.append(f"{entry}:{os.stat(entry or '.').st_mtime_ns}")
+        except OSError:
+            pass
+    return '\n'.join(parts)
+
+def _load_detected():
+    try:
+        with open(DEPENDENCY_CACHE, encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cached.get('key') != _environment_key():
+        return {}
+    return cached.get('modules', {})
+
+def _save_detected(modules):
+    try:
+        os.makedirs(os.path.dirname(DEPENDENCY_CACHE), exist_ok=True)
+        with open(DEPENDENCY_CACHE, 'w', encoding='utf-8') as f:
+            json.dump({'key': _environment_key(), 'modules': modules}, f)
+    except OSError:
+        pass  # Only a cache; detection simply runs again next time
+
 def check_module(module_name):
-    """Check if a Python module is installed."""
-    return importlib.util.find_spec(module_name) is not None
+    """Check if a Python module is installed, remembering the answer between runs."""
+    global _detected
+    if _detected is None:
+        _detected = _load_detected()
+    if module_name not in _detected:
+        _detected[module_name] = importlib.util.find_spec(module_name) is not None
+        _save_detected(_detected)
+    return _detected[module_name]
 
-def get_python_executable():
-    """Get the appropriate Python executable path."""
-    return sys.executable
+def report_startup(version):
+    """Print how long the launcher took before handing over to a front end."""
+    elapsed = (time.perf_counter() - STARTED) * 1000
+    print(f"Launcher ready in {elapsed:.0f} ms, starting the {version} version")
 
 def run_streamlit_app():
-    """Run the Streamlit web app version of the calculator."""
+    """Run the Streamlit web app version of the calculator.
+
+    Streamlit is started in this process rather than through a
+    ``streamlit`` subprocess, so the interpreter only starts once.
+    """
     print("Starting Python Calculator (Web Version)...")
-    python_exec = get_python_executable()
-    
-    # Check if streamlit is in PATH or in user's Python path
-    streamlit_in_path = False
+    app_path = os.path.join(HERE, "app.py")
     try:
-        subprocess.run(["streamlit", "--version"], capture_output=True, check=False)
-        streamlit_in_path = True
-    except FileNotFoundError:
-        # Check common locations for streamlit
-        common_paths = [
-            os.path.expanduser("~/Library/Python/3.9/bin/streamlit"),
-            os.path.expanduser("~/Library/Python/3.8/bin/streamlit"),
-            os.path.expanduser("~/.local/bin/streamlit"),
-        ]
-        for path in common_paths:
-            if os.path.exists(path):
-                streamlit_command = path
-                break
-        else:
-            streamlit_command = "streamlit"  # Will likely fail but worth trying
-    
-    if streamlit_in_path:
-        cmd = ["streamlit", "run", "app.py"]
-    else:
-        cmd = [python_exec, "-m", "streamlit", "run", "app.py"]
+        from streamlit.web import cli as streamlit_cli
+    except ImportError:
+        # Streamlit versions without streamlit.web: replace this process instead
+        report_startup("web")
+        os.execv(sys.executable, [sys.executable, "-m", "streamlit", "run", app_path])
     
+    report_startup("web")
     try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError:
-        print("Error running Streamlit app. Trying alternative method...")
-        # Try alternative way to run streamlit
-        try:
-            subprocess.run([streamlit_command, "run", "app.py"], check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            print("Failed to run Streamlit app. Please make sure Streamlit is installed:")
-            print("pip install streamlit")
-            print("\nAlternatively, try opening the desktop calculator.")
-            return False
+        streamlit_cli.main(["run", app_path], prog_name="streamlit", standalone_mode=False)
+    except Exception as e:
+        print(f"Failed to run Streamlit app: {e}")
+        print("Please make sure Streamlit is installed: pip install streamlit")
+        print("\nAlternatively, try opening the desktop calculator.")
+        return False
     
     return True
 
 def run_desktop_app():
-    """Run the desktop PyQt version of the calculator."""
+    """Run the desktop PyQt version of the calculator in this process.
+
+    Returns False if it could not start, so the caller can fall back to the
+    web version.
+    """
     print("Starting Python Calculator (Desktop Version)...")
-    python_exec = get_python_executable()
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
     
     try:
-        subprocess.run([python_exec, "pyqt_calculator.py"], check=True)
+        import pyqt_calculator
+        report_startup("desktop")
+        pyqt_calculator.main()
         return True
-    except subprocess.CalledProcessError:
-        print("Error running desktop calculator.")
+    except SystemExit as e:
+        # Not expected from an import, but it must not end the launcher
+        print(f"Desktop calculator exited during startup (status {e.code})")
         return False
+    except Exception as e:
+        print(f"Error running desktop calculator: {e}")
+        return False
+
+def _open_text(path, mode):
+    """Open a file for line-by-line text I/O, treating '-' as stdin/stdout."""
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, encoding='utf-8', newline='')
+
+def run_batch(args):
+    """Evaluate expressions line by line, streaming results to the output.
+
+    Input is read lazily and results are written as they are produced, so
+    memory use does not depend on the size of the input. Returns the exit
+    status: 0 on success, 1 if any expression failed.
+    """
+    from calc_engine import evaluate_parallel
+
+    parser = argparse.ArgumentParser(
+        prog="run_calculator.py --batch",
+        description="Evaluate calculator expressions, one per line.",
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file with one expression per line (default: stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="file to write results to (default: stdout)")
+    parser.add_argument('--format', choices=['plain', 'csv', 'jsonl'], default='plain',
+                        help="output format (default: plain)")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="continue past expressions that fail instead of stopping")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes to evaluate with; 0 uses one per CPU (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="expressions handed to a worker at a time (default: 1000)")
+    parser.add_argument('--timeout', type=float, default=BATCH_TIMEOUT,
+                        help="seconds allowed per expression; 0 for no limit "
+                             f"(default: {BATCH_TIMEOUT})")
+    options = parser.parse_args(args)
+    if options.workers < 0 or options.chunk_size < 1 or options.timeout < 0:
+        parser.error("--workers and --timeout must be >= 0 and --chunk-size >= 1")
+
+    source = _open_text(options.input, 'r')
+    sink = _open_text(options.output, 'w')
+    failed = False
+    try:
+        # Blank lines, such as separators between groups of formulas, are skipped
+        lines = (line.rstrip('\r\n') for line in source)
+        # tee only buffers the lines handed to workers but not yet written out
+        expressions, to_evaluate = itertools.tee(line for line in lines if line.strip())
+        csv_writer = csv.writer(sink) if options.format == 'csv' else None
+        results = evaluate_parallel(to_evaluate, workers=options.workers or None,
+                                    chunk_size=options.chunk_size, timeout=options.timeout or None)
+        for expression, result in zip(expressions, results):
+            is_error = result.startswith("Error")
+            if options.format == 'plain':
+                sink.write(result + '\n')
+            elif csv_writer is not None:
+                csv_writer.writerow([expression, result])
+            else:
+                record = {'expression': expression, 'result': result, 'error': is_error}
+                sink.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if is_error:
+                failed = True
+                if not options.keep_going:
+                    print(f"Stopped at failing expression: {expression}", file=sys.stderr)
+                    break
+        sink.flush()
+    except BrokenPipeError:
+        # Downstream reader (e.g. `head`) closed the pipe; nothing left to do
+        sys.stderr.close()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    
+    return 1 if failed else 0
 
 def main():
     """Main function to determine which calculator to run."""
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        # Headless mode: keep stdout clean for pipelines
+        sys.exit(run_batch(sys.argv[2:]))
+    
     print("Python Calculator Runner")
     print("=======================")
-    print("Checking available dependencies...")
-    
-    web_available = check_module("streamlit")
-    desktop_available = check_module("PyQt5")
     
+    # Only the modules a request needs are detected, and results are cached
     if len(sys.argv) > 1 and sys.argv[1] == "--web":
         # User explicitly requested web version
-        if web_available:
+        if check_module("streamlit"):
             run_streamlit_app()
         else:
             print("Streamlit is not installed. Please install it with:")
             print("pip install streamlit")
             print("\nAttempting to run desktop version instead...")
-            if desktop_available:
+            if check_module("PyQt5"):
                 run_desktop_app()
             else:
                 print("Desktop version dependencies (PyQt5) are also not available.")
@@ -100,13 +233,13 @@ def main():
     
     elif len(sys.argv) > 1 and sys.argv[1] == "--desktop":
         # User explicitly requested desktop version
-        if desktop_available:
+        if check_module("PyQt5"):
             run_desktop_app()
         else:
             print("PyQt5 is not installed. Please install it with:")
             print("pip install PyQt5")
             print("\nAttempting to run web version instead...")
-            if web_available:
+            if check_module("streamlit"):
                 run_streamlit_app()
             else:
                 print("Web version dependencies (Streamlit) are also not available.")
@@ -114,6 +247,8 @@ def main():
     
     else:
         # Auto-detect - prefer desktop on Mac/Windows, web otherwise
+        web_available = check_module("streamlit")
+        desktop_available = check_module("PyQt5")
         print("Available calculator versions:")
         if web_available:
             print("- Web version (Streamlit): Available")
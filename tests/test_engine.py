@@ -0,0 +1,219 @@
+"""
+Results and error strings of the calculation engine.
+
+Covers the behaviour both front ends relied on before the parser was
+introduced, plus the parser's own rules (implicit multiplication,
+parentheses closed at the end, unary minus), so that a change to the
+parser, compiler or plan cache cannot change what users see unnoticed.
+
+    python -m pytest tests
+"""
+
+import math
+import unittest
+
+from calc_engine import CalculationError, calculate_factorial, evaluate_expression, parse, plan_cache
+from calc_engine.evaluator import MAX_FACTORIAL
+
+
+class EngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Every case is checked on a cold plan cache
+        plan_cache.clear()
+
+    def assertResults(self, cases):
+        for expression, expected in cases:
+            with self.subTest(expression=expression):
+                self.assertEqual(evaluate_expression(expression), expected)
+
+
+class ArithmeticTest(EngineTestCase):
+
+    def test_operators_and_precedence(self):
+        self.assertResults([
+            ('', "0"),
+            ('2+3×4', "14"),
+            ('2+3×4-5÷5', "13"),
+            ('10÷4', "2.5"),
+            ('10÷3', "3.3333333333"),
+            ('2*3/4', "1.5"),
+            ('0.1+0.2', "0.3"),
+            (' 2 + 3 ', "5"),
+        ])
+
+    def test_unary_minus(self):
+        self.assertResults([
+            ('-2+3', "1"),
+            ('-(2+3)', "-5"),
+            ('2×-3', "-6"),
+            ('5--3', "8"),
+            ('-x²(3)', "-9"),
+            ('x²(-3)', "9"),
+        ])
+
+    def test_percent(self):
+        self.assertResults([
+            ('50%', "0.5"),
+            ('200×10%', "20"),
+            ('(50)%', "0.5"),
+            ('10%%', "0.001"),
+        ])
+
+    def test_constants_and_implicit_multiplication(self):
+        self.assertResults([
+            ('π', "3.1415926536"),
+            ('e', "2.7182818285"),
+            ('2π', "6.2831853072"),
+            ('2(3)', "6"),
+            ('(2)(3)', "6"),
+            ('2sin(30)', "1"),
+        ])
+
+    def test_number_formats(self):
+        self.assertResults([
+            ('3e-8', "3.0000000000e-08"),
+            ('1e3', "1000"),
+            ('12345678.5', "1.2345678500e+07"),
+        ])
+
+    def test_division_by_zero(self):
+        self.assertResults([
+            ('1/0', "Error: Division by zero"),
+            ('5÷0', "Error: Division by zero"),
+            ('5÷(3-3)', "Error: Division by zero"),
+            ('1÷0.0', "Error: Division by zero"),
+        ])
+
+
+class FunctionTest(EngineTestCase):
+
+    def test_results(self):
+        self.assertResults([
+            ('√(16)', "4"),
+            ('√(2)', "1.4142135624"),
+            ('∛(27)', "3"),
+            ('∛(-8)', "-2"),
+            ('sin(30)', "0.5"),
+            ('cos(0)', "1"),
+            ('log(100)', "2"),
+            ('ln(1)', "0"),
+            ('x³(2)', "8"),
+            ('x²(x²(x²(2)))', "256"),
+        ])
+
+    def test_domain_errors(self):
+        self.assertResults([
+            ('√(-4)', "Error: Cannot find square root of negative number"),
+            ('√(2-3)', "Error: Cannot find square root of negative number"),
+            ('log(0)', "Error: Cannot find log of zero or negative number"),
+            ('log(-5)', "Error: Cannot find log of zero or negative number"),
+            ('ln(0)', "Error: Cannot find ln of zero or negative number"),
+            ('ln(-1)', "Error: Cannot find ln of zero or negative number"),
+            ('tan(90)', "Error: Tangent undefined at this angle"),
+        ])
+
+    def test_syntax_errors_come_before_domain_errors(self):
+        self.assertResults([
+            ('√(-4)+', "Error: Invalid syntax"),
+            ('1/0)', "Error: Invalid syntax"),
+        ])
+
+
+class ParenthesesTest(EngineTestCase):
+
+    def test_unclosed_parentheses_are_closed_at_the_end(self):
+        self.assertResults([
+            ('(2+3', "5"),
+            ('((((1+2)', "3"),
+            ('2×(3+4', "14"),
+            ('sin(cos(0)', "0.0174524064"),
+        ])
+
+    def test_unbalanced_or_empty_parentheses(self):
+        self.assertResults([
+            ('2+3)', "Error: Invalid syntax"),
+            (')(', "Error: Invalid syntax"),
+            ('()', "Error: Invalid syntax"),
+            ('(', "Error: Invalid syntax"),
+            ('√(', "Error: Invalid syntax"),
+        ])
+
+    def test_deep_nesting(self):
+        self.assertEqual(evaluate_expression('(' * 100 + '1' + ')' * 100), "1")
+        self.assertEqual(evaluate_expression('sin(' * 500 + '0' + ')' * 500), "0")
+        self.assertEqual(evaluate_expression('(' * 5000 + '1' + ')' * 5000), "Error: Expression too deeply nested")
+
+
+class SyntaxErrorTest(EngineTestCase):
+
+    def test_invalid_input(self):
+        self.assertResults([
+            ('+', "Error: Invalid syntax"),
+            ('2+', "Error: Invalid syntax"),
+            ('2^3', "Error: Invalid syntax"),
+            ('abc', "Error: Invalid syntax"),
+            ('3!', "Error: Invalid syntax"),
+            ('1.5.2', "Error: Invalid syntax"),
+            ('.', "Error: Invalid syntax"),
+            ('-2²', "Error: Invalid syntax"),
+        ])
+
+    def test_keypad_multiplication_signs_do_not_make_a_power(self):
+        self.assertResults([
+            ('2**3', "8"),
+            ('2××3', "Error: Invalid syntax"),
+            ('2**3', "8"),
+        ])
+
+    def test_literal_longer_than_int_conversion_limit(self):
+        self.assertEqual(evaluate_expression('9' * 5000), "Error: Number too large")
+        with self.assertRaises(CalculationError):
+            parse('9' * 5000)
+
+
+class LimitTest(EngineTestCase):
+
+    def test_oversized_results_are_refused(self):
+        self.assertResults([
+            ('9**9**9', "Error: Result too large"),
+            ('1e400', "Error: Infinite result"),
+        ])
+
+    def test_huge_results_are_summarized(self):
+        self.assertEqual(evaluate_expression('2**20000'), "3.980276840…e+6020")
+
+
+class FactorialTest(EngineTestCase):
+
+    def test_results(self):
+        for value, expected in [(0, "1"), (1, "1"), (5, "120"), ('5', "120"), (2.5, "2"), ('2.5', "2")]:
+            with self.subTest(value=value):
+                self.assertEqual(calculate_factorial(value), expected)
+        self.assertResults([('!(5)', "120"), ('!(0)', "1"), ('!(3)+1', "7")])
+
+    def test_beyond_the_float_range(self):
+        # 170! was the limit before big factorials
+        self.assertTrue(calculate_factorial(171).startswith("12410180702176678234248405241031039926"))
+
+    def test_module_is_not_shadowed(self):
+        # The package re-exports the evaluator's factorial() under its own name
+        import calc_engine.bigfact as bigfact
+        self.assertEqual(bigfact.big_factorial(20), math.factorial(20))
+
+    def test_errors(self):
+        for value, expected in [
+            (-1, "Error: Negative number"),
+            ('abc', "Error: Invalid Input"),
+            (MAX_FACTORIAL + 1, "Error: Number too large"),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(calculate_factorial(value), expected)
+        self.assertResults([
+            ('!(-1)', "Error: Negative number"),
+            (f'!({MAX_FACTORIAL + 1})', "Error: Number too large"),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()